@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+from tabulate import tabulate
+from data import ConnectionManager, CartSession, CATALOG, CONNECTION_PROFILES, DEFAULT_PROFILE
+from generate_tables import create_tables
+
+# Simulates N tills ringing up sales against one database file at the same
+# time. Every terminal is its own process, like separate tills would be.
+# Sales go through a CartSession and one finalize_sale, as Window1.commit_cart
+# does; --per-scan writes every line with scan_item instead, for comparison.
+
+def seed(db_name, items):
+	create_tables(db_name)
+	conn = sqlite3.connect(db_name)
+	conn.executemany("""
+		INSERT INTO items (item_id, item_name, item_price, item_stock)
+		VALUES (?, ?, ?, ?)
+	""", [(i, f"URUN {i}", round(random.uniform(5, 200), 2), 1000000) for i in range(1, items + 1)])
+	conn.commit()
+	conn.close()
+
+def ring_up_cart(db, sale_id, customer_name, lines, items, journal_dir):
+	session = CartSession(sale_id, customer_name, journal_dir=journal_dir)
+	ok = all(session.reserve(CATALOG, random.randint(1, items)) for _ in range(lines))
+	reservations, journal = session.begin_commit()
+	ok = ok and db.finalize_sale(sale_id, "Nakit", None, reservations, journal)
+	session.end_commit(ok, reservations)
+	session.close()
+	return ok
+
+def ring_up_per_scan(db, sale_id, lines, items):
+	ok = all(db.scan_item(sale_id, random.randint(1, items)) is not None for _ in range(lines))
+	return ok and db.finalize_sale(sale_id, "Nakit")
+
+def run_terminal(terminal_id, db_name, profile, sales, lines, items, per_scan, journal_dir, start, results):
+	sys.stdout = open(os.devnull, "w")
+	db = ConnectionManager(profile, db_name, terminal_id).get()
+	CATALOG.warm(db)
+	latencies = []
+	failures = 0
+	start.wait()
+	for _ in range(sales):
+		started = time.perf_counter()
+		customer_name = f"KASA {terminal_id}"
+		sale_id = db.start_new_sale(customer_name)
+		ok = sale_id is not None
+		if ok and per_scan:
+			ok = ring_up_per_scan(db, sale_id, lines, items)
+		elif ok:
+			ok = ring_up_cart(db, sale_id, customer_name, lines, items, journal_dir)
+		latencies.append((time.perf_counter() - started) * 1000)
+		failures += not ok
+	db.close()
+	results.put((terminal_id, latencies, failures, db.busy_retries))
+
+def percentile(values, p):
+	values = sorted(values)
+	return values[min(len(values) - 1, int(len(values) * p))]
+
+def main():
+	parser = argparse.ArgumentParser(description="Write-contention benchmark for tills sharing one database.")
+	parser.add_argument("--terminals", type=int, default=3, choices=range(1, 10), metavar="1-9")
+	parser.add_argument("--sales", type=int, default=200, help="sales per terminal")
+	parser.add_argument("--lines", type=int, default=5, help="scanned items per sale")
+	parser.add_argument("--per-scan", action="store_true", help="write each line with scan_item instead of one commit per sale")
+	parser.add_argument("--items", type=int, default=1000)
+	parser.add_argument("--profile", choices=CONNECTION_PROFILES, default=DEFAULT_PROFILE)
+	parser.add_argument("--db", help="database file to use instead of a fresh temporary one")
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as tmp:
+		db_name = args.db or os.path.join(tmp, "bench.db")
+		if not args.db:
+			seed(db_name, args.items)
+		ctx = multiprocessing.get_context("spawn")
+		start = ctx.Event()
+		results = ctx.Queue()
+		terminals = [
+			ctx.Process(target=run_terminal, args=(
+				i, db_name, args.profile, args.sales, args.lines, args.items,
+				args.per_scan, os.path.join(tmp, "journals", str(i)), start, results
+			))
+			for i in range(1, args.terminals + 1)
+		]
+		for terminal in terminals:
+			terminal.start()
+		time.sleep(1)
+		started = time.perf_counter()
+		start.set()
+		rows = [results.get() for _ in terminals]
+		elapsed = time.perf_counter() - started
+		for terminal in terminals:
+			terminal.join()
+
+	rows.sort()
+	table = [
+		(f"Kasa {terminal_id}", len(latencies), f"{percentile(latencies, 0.5):.1f}", f"{percentile(latencies, 0.95):.1f}", f"{max(latencies):.1f}", retries, failures)
+		for terminal_id, latencies, failures, retries in rows
+	]
+	every = [ms for _, latencies, _, _ in rows for ms in latencies]
+	table.append(("TOPLAM", len(every), f"{percentile(every, 0.5):.1f}", f"{percentile(every, 0.95):.1f}", f"{max(every):.1f}", sum(r[3] for r in rows), sum(r[2] for r in rows)))
+	print(tabulate(table, headers=["Terminal", "Satış", "p50 ms", "p95 ms", "max ms", "Busy retry", "Hata"]))
+	mode = "satır başına yazım" if args.per_scan else "sepet"
+	print(f"\n{len(every) / elapsed:.0f} satış/sn, {args.terminals} terminal, {args.lines} satır/satış, {mode}, profil '{args.profile}'")
+
+if __name__ == "__main__":
+	main()
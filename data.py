@@ -1,19 +1,315 @@
+import os
+import json
 import random
 import time
 import sqlite3
-from datetime import datetime
+import threading
+import uuid
+from bisect import bisect_right
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from PySide6.QtCore import QObject, Signal, QTimer
+from generate_tables import TURKISH_FOLD
 
-class DatabaseManager:
+# WAL in both profiles: tills may share the file only on one machine, never over a network share
+CONNECTION_PROFILES = {
+	"durable": {
+		"journal_mode": "WAL",
+		"synchronous": "FULL",
+		"busy_timeout": 250,
+		"cache_size": -16000,
+		"mmap_size": 0,
+		"temp_store": "MEMORY"
+	},
+	"throughput": {
+		"journal_mode": "WAL",
+		"synchronous": "NORMAL",
+		"busy_timeout": 250,
+		"cache_size": -64000,
+		"mmap_size": 268435456,
+		"temp_store": "MEMORY"
+	}
+}
+DEFAULT_PROFILE = "throughput"
+DB_NAME = "database.db"
+STREAM_BATCH_SIZE = 500
+# Tills sharing one database.db tell themselves apart by POSTRINK_TERMINAL; a single
+# digit keeps sale ids within LENGTH(sale_id) <= 15. Anything else is 0 and refused.
+TERMINAL_IDS = range(1, 10)
+_terminal = os.environ.get("POSTRINK_TERMINAL", "1").strip()
+TERMINAL_ID = int(_terminal) if _terminal.isdigit() and int(_terminal) in TERMINAL_IDS else 0
+JOURNAL_DIR = os.path.join("journals", str(TERMINAL_ID))
+# BEGIN IMMEDIATE attempts on SQLITE_BUSY, each after busy_timeout; backoff doubles from WRITE_BACKOFF seconds
+WRITE_RETRIES = 6
+WRITE_BACKOFF = 0.02
+# Stock movements older than this are folded into per-item snapshots by compact_stock_movements
+STOCK_HISTORY_DAYS = 90
+STOCK_COMPACTION_INTERVAL = 6 * 60 * 60 * 1000
+CHANGE_POLL_INTERVAL = 500
+CHANGE_LOG_KEEP = 10000
+REPORT_TOP_ITEMS = 20
+
+TURKISH_CASE = str.maketrans(dict(TURKISH_FOLD))
+
+def turkish_fold(text):
+	return text.translate(TURKISH_CASE).lower()
+
+def parse_range(text):
+	# "5", ">5", "<=5", "5-10", "5-" or "-10"; None when the input is not numeric
+	text = text.strip().replace(",", ".")
+	try:
+		for op in (">=", "<=", ">", "<"):
+			if text.startswith(op):
+				return [(op, float(text[len(op):]))]
+		if "-" in text:
+			low, high = (part.strip() for part in text.split("-", 1))
+			bounds = []
+			if low:
+				bounds.append((">=", float(low)))
+			if high:
+				bounds.append(("<=", float(high)))
+			return bounds
+		return [("=", float(text))]
+	except ValueError:
+		return None
+
+# Hours at which a till shift starts; the last one runs past midnight into the first
+SHIFT_STARTS = (8, 16)
+DAY_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y")
+MINUTE_FORMATS = tuple(f"{fmt} %H:%M" for fmt in DAY_FORMATS)
+
+def _day_start(moment):
+	return datetime(moment.year, moment.month, moment.day)
+
+def period_range(period, now=None):
+	now = now or datetime.now()
+	today = _day_start(now)
+	if period == "today":
+		return today, today + timedelta(days=1)
+	if period == "yesterday":
+		return today - timedelta(days=1), today
+	if period == "week":
+		monday = today - timedelta(days=today.weekday())
+		return monday, monday + timedelta(days=7)
+	if period == "month":
+		start = today.replace(day=1)
+		return start, (start + timedelta(days=32)).replace(day=1)
+	if period == "shift":
+		starts = [day + timedelta(hours=hour) for day in (today - timedelta(days=1), today, today + timedelta(days=1)) for hour in SHIFT_STARTS]
+		start = max(moment for moment in starts if moment <= now)
+		return start, min(moment for moment in starts if moment > now)
+	return None
+
+def _parse_bound(text):
+	for formats, span in ((MINUTE_FORMATS, timedelta(minutes=1)), (DAY_FORMATS, timedelta(days=1))):
+		for fmt in formats:
+			try:
+				start = datetime.strptime(text, fmt)
+			except ValueError:
+				continue
+			return start, start + span
+	return None
+
+def parse_date_range(text):
+	# "18.10.2026", "2026-10-18 08:00" or "01.10.2026 - 15.10.2026" (both ends inclusive)
+	parts = [part.strip() for part in text.replace("..", " - ").split(" - ")]
+	if len(parts) > 2:
+		return None
+	bounds = [_parse_bound(part) for part in parts]
+	if None in bounds:
+		return None
+	return bounds[0][0], bounds[-1][1]
+
+def report_buckets(period=None, date_input="", hourly=None):
+	# (hourly, first, end) rollup keys covering the typed range, or the period when
+	# nothing is typed; partial buckets are rounded outward. hourly=None uses day
+	# buckets whenever the range starts and ends on a midnight. None (all time) only
+	# when neither is given; a date or period that can't be read raises ValueError.
+	if date_input:
+		bounds = parse_date_range(date_input)
+		if not bounds:
+			raise ValueError(f"unreadable date range '{date_input}'")
+	elif period:
+		bounds = period_range(period)
+		if not bounds:
+			raise ValueError(f"unknown period '{period}'")
+	else:
+		return None
+	start, end = bounds
+	if hourly is None:
+		hourly = start != _day_start(start) or end != _day_start(end)
+	if hourly:
+		floor, step, fmt = lambda moment: moment.replace(minute=0, second=0, microsecond=0), timedelta(hours=1), "%Y-%m-%dT%H"
+	else:
+		floor, step, fmt = _day_start, timedelta(days=1), "%Y-%m-%d"
+	last = floor(end)
+	if last < end:
+		last += step
+	return hourly, floor(start).strftime(fmt), last.strftime(fmt)
+
+# Plain tuples with field names: rows streamed by the iter_* methods carry no per-row dict
+SaleRow = namedtuple("SaleRow", "sale_id sale_date customer_name total_amount payment_method")
+ItemRow = namedtuple("ItemRow", "item_id item_name item_price item_stock")
+SALE_COLUMNS = ", ".join(SaleRow._fields)
+ITEM_COLUMNS = ", ".join(ItemRow._fields)
+ITEM_EDIT_COLUMNS = ("item_name", "item_price", "item_stock")
+ChangeRow = namedtuple("ChangeRow", "seq table_name row_key op")
+
+def sorted_position(rows, sort_key, key, descending=False):
+	# Binary search over rows already ordered by sort_key, in either direction
+	low, high = 0, len(rows)
+	while low < high:
+		middle = (low + high) // 2
+		current = sort_key(rows[middle])
+		if (current > key) if descending else (current < key):
+			low = middle + 1
+		else:
+			high = middle
+	return low
+
+POST_SALE_HOOKS = []
+POST_SALE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="post-sale")
+
+def add_post_sale_hook(hook):
+	POST_SALE_HOOKS.append(hook)
+	return hook
+
+def _run_post_sale_hook(hook, sale):
+	try:
+		hook(sale)
+	except Exception as e:
+		print(f"ERROR   : post-sale hook {hook.__name__}: {e}")
+
+def dispatch_post_sale(sale):
+	for hook in POST_SALE_HOOKS:
+		POST_SALE_POOL.submit(_run_post_sale_hook, hook, sale)
+
+class CampaignIndex:
 	def __init__(self):
+		self.tiers = {}
+		self.version = None
+
+	def load(self, conn):
+		# Built aside and swapped in, so a copy() handed to another thread never sees it half-filled
+		tiers = {}
+		cursor = conn.cursor()
+		cursor.execute("""
+			SELECT item_id, min_quan, disc_type, disc_val
+			FROM campaigns
+			ORDER BY item_id, min_quan
+		""")
+		for item_id, min_quan, disc_type, disc_val in cursor.fetchall():
+			min_quans, camps = tiers.setdefault(item_id, ([], []))
+			min_quans.append(min_quan)
+			camps.append((disc_type, disc_val))
+		self.tiers = tiers
+
+	def invalidate(self):
+		self.version = None
+
+	def copy(self):
+		index = CampaignIndex()
+		index.tiers, index.version = self.tiers, self.version
+		return index
+
+	def resolve(self, item_id, item_count):
+		tiers = self.tiers.get(item_id)
+		if not tiers:
+			return None
+		i = bisect_right(tiers[0], item_count)
+		return tiers[1][i - 1] if i else None
+
+	def price_line(self, item_id, item_count, item_price):
+		base_total = (item_price or 0) * (item_count or 0)
+		discount_num = 0.0
+		discount_perc = 0.0
+		camp = self.resolve(item_id, item_count or 0)
+		if camp:
+			disc_type, disc_val = camp
+			if disc_type == "percent":
+				discount_num = base_total * (disc_val / 100.0)
+				discount_perc = disc_val
+			elif disc_type == "fixed":
+				discount_num = min(base_total, disc_val)  # don’t go negative
+				discount_perc = (discount_num / base_total * 100.0) if base_total > 0 else 0.0
+		return discount_perc, discount_num, base_total - discount_num
+
+class CatalogCache:
+	# Shared by every DatabaseManager in the process (UI thread and worker
+	# threads), so each write path updates it right after its own commit.
+	def __init__(self):
+		self.items = {}
+		self.lock = threading.Lock()
+
+	def warm(self, db):
+		items = {row.item_id: row for row in db.iter_filtered_items()}
+		with self.lock:
+			self.items = items
+		print(f"CATALOG : {len(items)} items cached.")
+
+	def get(self, item_id):
+		return self.items.get(item_id)
+
+	def price(self, item_id):
+		row = self.items.get(item_id)
+		return row.item_price if row else None
+
+	def stock(self, item_id):
+		row = self.items.get(item_id)
+		return row.item_stock if row else 0
+
+	def available(self, item_id, count=1):
+		return self.stock(item_id) >= count
+
+	def available_products(self):
+		return [row for row in self.items.values() if row.item_stock > 0]
+
+	def put(self, row):
+		row = ItemRow._make(row)
+		with self.lock:
+			self.items[row.item_id] = row
+
+	def discard(self, item_id):
+		with self.lock:
+			self.items.pop(item_id, None)
+
+	def refresh(self, item_ids, rows):
+		# rows: the current items among item_ids; ids without a row were removed
+		rows = {row.item_id: row for row in map(ItemRow._make, rows)}
+		with self.lock:
+			for item_id in item_ids:
+				if item_id in rows:
+					self.items[item_id] = rows[item_id]
+				else:
+					self.items.pop(item_id, None)
+
+CATALOG = CatalogCache()
+
+class DatabaseManager:
+	def __init__(self, profile=DEFAULT_PROFILE, db_name=DB_NAME, terminal_id=TERMINAL_ID):
 		self.conn = None
-		self.db_name = 'database.db'
+		if terminal_id not in TERMINAL_IDS:
+			raise ValueError(f"terminal_id must be 1-9, got {terminal_id!r}")
+		self.db_name = db_name
+		self.terminal_id = terminal_id
+		self.busy_retries = 0
+		if profile not in CONNECTION_PROFILES:
+			print(f"DATABASE: Unknown profile '{profile}', using '{DEFAULT_PROFILE}'.")
+			profile = DEFAULT_PROFILE
+		self.profile = profile
+		self.campaign_index = CampaignIndex()
+		self.catalog = CATALOG
 		self.connect()
 
 	def connect(self):
 		try:
-			self.conn = sqlite3.connect(self.db_name)
+			# ConnectionManager keeps each manager on one thread; closing from shutdown needs the flag off
+			self.conn = sqlite3.connect(self.db_name, check_same_thread=False)
 			self.conn.row_factory = sqlite3.Row
-			print("DATABASE: Successfully connected.")
+			for pragma, value in CONNECTION_PROFILES[self.profile].items():
+				self.conn.execute(f"PRAGMA {pragma} = {value}")
+			print(f"DATABASE: Successfully connected. ({self.profile})")
 		except sqlite3.Error as e:
 			print(f"DATABASE: Connection failed: {e}")
 
@@ -22,31 +318,58 @@ class DatabaseManager:
 			self.conn.close()
 			print("DATABASE: Connection closed.")
 
+	def begin_write(self):
+		# Take the write lock before the first read so two tills never deadlock
+		# upgrading read locks; SQLITE_BUSY past busy_timeout is retried with backoff.
+		for attempt in range(WRITE_RETRIES):
+			try:
+				self.conn.execute("BEGIN IMMEDIATE")
+				return
+			except sqlite3.OperationalError as e:
+				if e.sqlite_errorcode & 0xff != sqlite3.SQLITE_BUSY or attempt == WRITE_RETRIES - 1:
+					raise
+				self.busy_retries += 1
+				time.sleep(WRITE_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+
 	def start_new_sale(self, customer_name):
-		sale_id = f"{int(time.time())}-{random.randint(100, 999)}"
 		sale_date = datetime.now().isoformat()
 		try:
+			self.begin_write()
 			cursor = self.conn.cursor()
-			cursor.execute("""
-				INSERT INTO sales (sale_id, sale_date, customer_name, total_discount_perc, total_discount_num, total_amount, payment_method, payment_info)
-				VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-			""", (sale_id, sale_date, customer_name, 0, 0.0, 0.0, "WIP", ""))
+			for attempt in range(3):
+				# "<seconds>-<terminal><milliseconds>": unique per till unless two sales share a millisecond
+				now = int(time.time() * 1000)
+				sale_id = f"{now // 1000}-{self.terminal_id}{now % 1000:03d}"
+				try:
+					cursor.execute("""
+						INSERT INTO sales (sale_id, sale_date, customer_name, total_discount_perc, total_discount_num, total_amount, payment_method, payment_info)
+						VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+					""", (sale_id, sale_date, customer_name, 0, 0.0, 0.0, "WIP", ""))
+					break
+				except sqlite3.IntegrityError:
+					if attempt == 2:
+						raise
+					time.sleep(0.001)
 			self.conn.commit()
 			print(f"NEW SALE: {sale_id} | {customer_name}")
 			return sale_id
 		except sqlite3.Error as e:
+			self.conn.rollback()
 			print(f"ERROR   : start_new_sale: {e}")
 			return None
 
 	def update_sale_payment_info(self, sale_id, payment_method, payment_info=None):
 		try:
+			self.begin_write()
 			cursor = self.conn.cursor()
+			self._rollup_sale(cursor, sale_id, -1)
 			cursor.execute("""
 				UPDATE sales
 				SET payment_method = ?,
 					payment_info = ?
 				WHERE sale_id = ?
 			""", (payment_method, payment_info, sale_id))
+			self._rollup_sale(cursor, sale_id, 1)
 			self.conn.commit()
 			print(f"UPDATE  : {sale_id} payment_method updated to '{payment_method}'")
 			if payment_info:
@@ -54,21 +377,72 @@ class DatabaseManager:
 			return True
 		except sqlite3.Error as e:
 			print(f"ERROR    : update_sale_payment_info: {e}")
+			self.conn.rollback()
 			return False
 
 	def update_sale_date(self, sale_id):
 		try:
+			self.begin_write()
 			sale_date = datetime.now().isoformat()
 			cursor = self.conn.cursor()
+			self._rollup_sale(cursor, sale_id, -1)
 			cursor.execute("""
 				UPDATE sales
 				SET sale_date = ?
 				WHERE sale_id = ?
 			""", (sale_date, sale_id))
+			self._rollup_sale(cursor, sale_id, 1)
 			print(f"UPDATE  : {sale_id} sale_date updated to '{sale_date}'")
 			self.conn.commit()
 		except sqlite3.Error as e:
 			print(f"ERROR    : update_sale_date: {e}")
+			self.conn.rollback()
+
+	def finalize_sale(self, sale_id, payment_method, payment_info=None, reservations=(), journal=None):
+		try:
+			self.begin_write()
+			cur = self.conn.cursor()
+			# Re-paying or re-holding a paid sale takes its old lines and date back out first
+			self._rollup_sale(cur, sale_id, -1)
+			if not self._write_cart_session(cur, sale_id, reservations):
+				self.conn.rollback()
+				return False
+			cur.execute("""
+				UPDATE sales
+				SET payment_method = ?,
+					payment_info = ?,
+					sale_date = ?
+				WHERE sale_id = ?
+				RETURNING *
+			""", (payment_method, payment_info, datetime.now().isoformat(), sale_id))
+			sale = cur.fetchone()
+			if not sale:
+				print(f"ERROR   : finalize_sale: Sale {sale_id} not found.")
+				self.conn.rollback()
+				return False
+			sale = dict(sale)
+			self._rollup_sale(cur, sale_id, 1)
+			self._mark_journal(cur, sale_id, journal)
+			cur.execute("""
+				SELECT ci.item_id, i.item_name, ci.item_count, ci.item_discount_num, ci.item_total
+				FROM cart_items AS ci
+				JOIN items AS i ON i.item_id = ci.item_id
+				WHERE ci.sale_id = ?
+				ORDER BY ci.cart_item_id
+			""", (sale_id,))
+			sale["lines"] = [dict(r) for r in cur.fetchall()]
+			reserved = self._reserved_rows(cur, reservations)
+			self.conn.commit()
+			for row in reserved:
+				self.catalog.put(row)
+			print(f"UPDATE  : {sale_id} finalized as '{payment_method}' at '{sale['sale_date']}'")
+			if payment_method != "WIP":
+				dispatch_post_sale(sale)
+			return True
+		except sqlite3.Error as e:
+			print(f"ERROR   : finalize_sale: {e}")
+			self.conn.rollback()
+			return False
 
 	def get_available_products(self):
 		try:
@@ -130,114 +504,361 @@ class DatabaseManager:
 			return 0
 
 	def add_item_to_cart(self, sale_id, item_id, item_count, item_discount_perc, item_discount_num):
+		return self.scan_item(sale_id, item_id, item_count) is not None
+
+	def scan_item(self, sale_id, item_id, item_count=1):
 		try:
-			if (not self.check_item_available(item_id)):
-				return False
-			self.decrease_item_stock(item_id)
+			self.begin_write()
+			index = self.get_campaign_index()
 			cur = self.conn.cursor()
-			cur.execute("""
-				SELECT ci.item_count, ci.item_total, i.item_price
-				FROM cart_items ci
-				JOIN items i ON ci.item_id = i.item_id
-				WHERE ci.sale_id = ? AND ci.item_id = ?
-			""", (sale_id, item_id))
-			row = cur.fetchone()
-			if row:
-				new_count = row[0] + item_count
-				new_total = row[1] + (item_count * row[2])
-				cur.execute("""
-					UPDATE cart_items
-					SET item_count = ?,
-						item_total = ?
-					WHERE sale_id = ? AND item_id = ?
-				""", (new_count, new_total, sale_id, item_id))
-				self.conn.commit()
-				return True
-			cur.execute("""
-				SELECT item_price
+			try:
+				self._record_movements(cur, [(item_id, -item_count, "sale", sale_id)])
+			except sqlite3.IntegrityError:
+				# Not enough stock (CHECK on items) or no such item
+				self.conn.rollback()
+				return None
+			cur.execute(f"""
+				SELECT {ITEM_COLUMNS}
 				FROM items
 				WHERE item_id = ?
 			""", (item_id,))
-			price_row = cur.fetchone()
-			if not price_row:
-				print(f"ERROR:   Item ID not found: {item_id}")
-				return False
-			base_price = price_row[0]
-			line_total = base_price
-			if item_discount_perc:
-				line_total = line_total * (100 - item_discount_perc) / 100.0
-			if item_discount_num:
-				line_total = line_total - item_discount_num
-			cur.execute("""
-				INSERT INTO cart_items (sale_id, item_id, item_count, item_discount_perc, item_discount_num, item_total)
-				VALUES (?, ?, ?, ?, ?, ?)
-			""", (sale_id, item_id, item_count, item_discount_perc, item_discount_num, line_total * item_count))
-			self.conn.commit()
-			return True
-		except Exception as e:
-			print(f"ERROR   : add_item_to_cart: {e}")
-			self.conn.rollback()
-			return False
-
-	def apply_discounts(self, sale_id):
-		try:
-			cur = self.conn.cursor()
+			item = cur.fetchone()
 			cur.execute("""
-				SELECT ci.item_id, ci.item_count, i.item_price
-				FROM cart_items ci
-				JOIN items i ON i.item_id = ci.item_id
-				WHERE ci.sale_id = ?
-			""", (sale_id,))
-			rows = cur.fetchall()
-			for item_id, item_count, item_price in rows:
-				base_total = (item_price or 0) * (item_count or 0)
-				cur.execute("""
-					SELECT disc_type, disc_val, min_quan
-					FROM campaigns
-					WHERE item_id = ?
-					AND min_quan <= ?
-					ORDER BY min_quan DESC
-					LIMIT 1
-				""", (item_id, item_count))
-				camp = cur.fetchone()
-				discount_num = 0.0
-				discount_perc = 0.0
-				if camp and item_count >= camp["min_quan"]:
-					if camp["disc_type"] == "percent":
-						discount_num = base_total * (camp["disc_val"] / 100.0)
-						discount_perc = camp["disc_val"]
-					elif camp["disc_type"] == "fixed":
-						discount_num = min(base_total, camp["disc_val"])  # don’t go negative
-						discount_perc = (discount_num / base_total * 100.0) if base_total > 0 else 0.0
-				new_total = base_total - discount_num
+				SELECT item_count, item_discount_num, item_total
+				FROM cart_items
+				WHERE sale_id = ? AND item_id = ?
+			""", (sale_id, item_id))
+			old_line = cur.fetchone()
+			old_count, old_discount, old_total = old_line if old_line else (0, 0.0, 0.0)
+			new_count = old_count + item_count
+			discount_perc, discount_num, new_total = index.price_line(item_id, new_count, item["item_price"])
+			if old_line:
 				cur.execute("""
 					UPDATE cart_items
-					SET item_discount_perc = ?,
+					SET item_count         = ?,
+						item_discount_perc = ?,
 						item_discount_num  = ?,
 						item_total         = ?
 					WHERE sale_id = ? AND item_id = ?
-				""", (discount_perc, discount_num, new_total, sale_id, item_id))
-			cur.execute("""
-				SELECT COALESCE(SUM(item_discount_num), 0.0),
-					COALESCE(SUM(item_total), 0.0)
-				FROM cart_items
-				WHERE sale_id = ?
-			""", (sale_id,))
-			disc_sum, total_sum = cur.fetchone() or (0.0, 0.0)
+				""", (new_count, discount_perc, discount_num, new_total, sale_id, item_id))
+			else:
+				cur.execute("""
+					INSERT INTO cart_items (sale_id, item_id, item_count, item_discount_perc, item_discount_num, item_total)
+					VALUES (?, ?, ?, ?, ?, ?)
+				""", (sale_id, item_id, new_count, discount_perc, discount_num, new_total))
 			cur.execute("""
 				UPDATE sales
-				SET total_discount_num = ?,
-					total_amount       = ?
+				SET total_discount_num = total_discount_num + ?,
+					total_amount       = total_amount + ?
 				WHERE sale_id = ?
-			""", (disc_sum, total_sum, sale_id))
+			""", (discount_num - old_discount, new_total - old_total, sale_id))
+			self.conn.commit()
+			self.catalog.put(item)
+			return {
+				"item_id": item_id,
+				"item_name": item["item_name"],
+				"item_stock": item["item_stock"],
+				"item_count": new_count,
+				"item_discount_perc": discount_perc,
+				"item_discount_num": discount_num,
+				"item_total": new_total
+			}
+		except sqlite3.Error as e:
+			print(f"ERROR   : scan_item: {e}")
+			self.conn.rollback()
+			return None
+
+	def get_campaign_index(self):
+		# campaign_version is bumped by triggers on campaigns (migration 7), so sales
+		# and stock writes from this or other tills never force a reload
+		cursor = self.conn.cursor()
+		version = cursor.execute("SELECT version FROM campaign_version").fetchone()[0]
+		if self.campaign_index.version != version:
+			self.campaign_index.load(self.conn)
+			self.campaign_index.version = version
+		return self.campaign_index
+
+	def get_campaign_version(self):
+		try:
+			return self.conn.execute("SELECT version FROM campaign_version").fetchone()[0]
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_campaign_version: {e}")
+			return None
+
+	def get_campaign_snapshot(self):
+		# For CartState on the UI thread; this manager's own index reloads in place
+		try:
+			return self.get_campaign_index().copy()
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_campaign_snapshot: {e}")
+			return None
+
+	def add_campaign(self, item_id, min_quan, disc_type, disc_val):
+		try:
+			self.begin_write()
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				INSERT INTO campaigns (item_id, min_quan, disc_type, disc_val)
+				VALUES (?, ?, ?, ?)
+			""", (item_id, min_quan, disc_type, disc_val))
+			self.conn.commit()
+			self.campaign_index.invalidate()
+			print(f"CAMPAIGN: {item_id} | {disc_val} {disc_type} from {min_quan} pcs.")
+			return cursor.lastrowid
+		except sqlite3.Error as e:
+			print(f"ERROR   : add_campaign: {e}")
+			self.conn.rollback()
+			return None
+
+	def remove_campaign(self, camp_id):
+		try:
+			self.begin_write()
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				DELETE FROM campaigns
+				WHERE camp_id = ?
+			""", (camp_id, ))
+			self.conn.commit()
+			self.campaign_index.invalidate()
+			print(f"UPDATE  : {camp_id} campaign deleted.")
+		except sqlite3.Error as e:
+			print(f"ERROR   : remove_campaign: {e}")
+			self.conn.rollback()
+
+	def apply_discounts(self, sale_id):
+		try:
+			self.begin_write()
+			self._apply_discounts(self.conn.cursor(), sale_id)
 			self.conn.commit()
 		except Exception as e:
 			print(f"ERROR   : apply_discounts: {e}")
 			self.conn.rollback()
 
+	def _apply_discounts(self, cur, sale_id):
+		index = self.get_campaign_index()
+		cur.execute("""
+			SELECT ci.item_id, ci.item_count, i.item_price
+			FROM cart_items ci
+			JOIN items i ON i.item_id = ci.item_id
+			WHERE ci.sale_id = ?
+		""", (sale_id,))
+		lines = []
+		disc_sum = 0.0
+		total_sum = 0.0
+		for item_id, item_count, item_price in cur.fetchall():
+			discount_perc, discount_num, new_total = index.price_line(item_id, item_count, item_price)
+			lines.append((discount_perc, discount_num, new_total, sale_id, item_id))
+			disc_sum += discount_num
+			total_sum += new_total
+		cur.executemany("""
+			UPDATE cart_items
+			SET item_discount_perc = ?,
+				item_discount_num  = ?,
+				item_total         = ?
+			WHERE sale_id = ? AND item_id = ?
+		""", lines)
+		cur.execute("""
+			UPDATE sales
+			SET total_discount_num = ?,
+				total_amount       = ?
+			WHERE sale_id = ?
+		""", (disc_sum, total_sum, sale_id))
+
+	def replay_cart_journal(self, sale_id, session, entries):
+		# entries: (seq, item_id, item_count) read back from a CartSession journal.
+		# Only entries past the applied_seq stored with the last commit are written,
+		# and only into a sale that is still on hold. None when nothing may be replayed.
+		try:
+			self.begin_write()
+			cur = self.conn.cursor()
+			cur.execute("""
+				SELECT s.payment_method, j.session, j.applied_seq
+				FROM sales AS s
+				LEFT JOIN cart_journals AS j ON j.sale_id = s.sale_id
+				WHERE s.sale_id = ?
+			""", (sale_id, ))
+			row = cur.fetchone()
+			if not row:
+				print(f"ERROR   : replay_cart_journal: Sale {sale_id} no longer exists.")
+				self.conn.rollback()
+				return None
+			applied = row["applied_seq"] if row["session"] == session else 0
+			pending = {}
+			for seq, item_id, item_count in entries:
+				if seq > applied:
+					pending[item_id] = pending.get(item_id, 0) + item_count
+			# Trimmed lines are journaled as negative entries and can net out to nothing
+			reservations = [(item_id, count) for item_id, count in pending.items() if count > 0]
+			if reservations and row["payment_method"] != "WIP":
+				print(f"ERROR   : replay_cart_journal: {sale_id} is already paid as '{row['payment_method']}'.")
+				self.conn.rollback()
+				return None
+			if not reservations:
+				self.conn.rollback()
+				return 0
+			if not self._write_cart_session(cur, sale_id, reservations):
+				self.conn.rollback()
+				return None
+			self._mark_journal(cur, sale_id, (session, max(seq for seq, _, _ in entries)))
+			reserved = self._reserved_rows(cur, reservations)
+			self.conn.commit()
+			for row in reserved:
+				self.catalog.put(row)
+			return len(reservations)
+		except sqlite3.Error as e:
+			print(f"ERROR   : replay_cart_journal: {e}")
+			self.conn.rollback()
+			return None
+
+	def _mark_journal(self, cur, sale_id, journal):
+		# journal: (session, seq) of the last CartSession entry this commit includes
+		if not journal:
+			return
+		cur.execute("""
+			INSERT INTO cart_journals (sale_id, session, applied_seq)
+			VALUES (?, ?, ?)
+			ON CONFLICT (sale_id) DO UPDATE
+			SET session     = excluded.session,
+				applied_seq = excluded.applied_seq
+		""", (sale_id, *journal))
+
+	def _record_movements(self, cur, movements):
+		# movements: (item_id, delta, reason, sale_id); the stock_movements_apply
+		# trigger adds each delta to items.item_stock
+		moved_at = datetime.now().isoformat()
+		cur.executemany("""
+			INSERT INTO stock_movements (item_id, delta, reason, sale_id, moved_at, terminal_id)
+			VALUES (?, ?, ?, ?, ?, ?)
+		""", [(item_id, delta, reason, sale_id, moved_at, self.terminal_id) for item_id, delta, reason, sale_id in movements if delta])
+
+	def _adjust_stock_to(self, cur, item_id, stock):
+		moved_at = datetime.now().isoformat()
+		cur.execute("""
+			INSERT INTO stock_movements (item_id, delta, reason, sale_id, moved_at, terminal_id)
+			SELECT item_id, ? - item_stock, 'adjustment', NULL, ?, ?
+			FROM items
+			WHERE item_id = ? AND item_stock != ?
+		""", (stock, moved_at, self.terminal_id, item_id, stock))
+
+	def _write_cart_session(self, cur, sale_id, reservations):
+		if reservations:
+			try:
+				self._record_movements(cur, [(item_id, -count, "sale", sale_id) for item_id, count in reservations])
+			except sqlite3.IntegrityError:
+				print(f"ERROR   : {sale_id}: not enough stock left to persist the cart.")
+				return False
+			cur.executemany("""
+				UPDATE cart_items
+				SET item_count = item_count + ?
+				WHERE sale_id = ? AND item_id = ?
+			""", [(count, sale_id, item_id) for item_id, count in reservations])
+			cur.executemany("""
+				INSERT INTO cart_items (sale_id, item_id, item_count, item_discount_perc, item_discount_num, item_total)
+				SELECT ?, ?, ?, 0, 0.0, 0.0
+				WHERE NOT EXISTS (
+					SELECT 1
+					FROM cart_items
+					WHERE sale_id = ? AND item_id = ?
+				)
+			""", [(sale_id, item_id, count, sale_id, item_id) for item_id, count in reservations])
+		self._apply_discounts(cur, sale_id)
+		return True
+
+	def _rollup_sale(self, cur, sale_id, sign):
+		# Adds (sign=1) or takes back (sign=-1) a paid sale in the rollup tables, from
+		# the sale as it stands in this transaction; on-hold sales are not counted
+		cur.execute("""
+			SELECT sale_date, payment_method, total_amount, total_discount_num
+			FROM sales
+			WHERE sale_id = ? AND payment_method != 'WIP'
+		""", (sale_id, ))
+		sale = cur.fetchone()
+		if not sale:
+			return
+		hour, day = sale["sale_date"][:13], sale["sale_date"][:10]
+		for table, column, bucket in (("sales_hourly", "hour", hour), ("sales_daily", "day", day)):
+			cur.execute(f"""
+				INSERT INTO {table} ({column}, payment_method, sale_count, revenue, discount)
+				VALUES (?, ?, ?, ?, ?)
+				ON CONFLICT ({column}, payment_method) DO UPDATE
+				SET sale_count = sale_count + excluded.sale_count,
+					revenue    = ROUND(revenue + excluded.revenue, 2),
+					discount   = ROUND(discount + excluded.discount, 2)
+			""", (bucket, sale["payment_method"], sign, sign * sale["total_amount"], sign * sale["total_discount_num"]))
+		cur.execute("""
+			INSERT INTO item_sales_daily (day, item_id, quantity, revenue, discount)
+			SELECT ?, item_id, ? * item_count, ? * item_total, ? * item_discount_num
+			FROM cart_items
+			WHERE sale_id = ?
+			ON CONFLICT (day, item_id) DO UPDATE
+			SET quantity = quantity + excluded.quantity,
+				revenue  = ROUND(revenue + excluded.revenue, 2),
+				discount = ROUND(discount + excluded.discount, 2)
+		""", (day, sign, sign, sign, sale_id))
+		if sign < 0:
+			cur.execute("DELETE FROM sales_hourly WHERE hour = ? AND sale_count = 0", (hour, ))
+			cur.execute("DELETE FROM sales_daily WHERE day = ? AND sale_count = 0", (day, ))
+			cur.execute("DELETE FROM item_sales_daily WHERE day = ? AND quantity = 0", (day, ))
+
+	def _reserved_rows(self, cur, reservations):
+		# Rows as this transaction leaves them, for catalog.put after the commit;
+		# absolute rows stay correct whichever of this and a CatalogSync refresh lands last
+		if not reservations:
+			return []
+		item_ids = [item_id for item_id, _ in reservations]
+		cur.execute(f"""
+			SELECT {ITEM_COLUMNS}
+			FROM items
+			WHERE item_id IN ({", ".join("?" * len(item_ids))})
+		""", item_ids)
+		return cur.fetchall()
+
+	def get_sale_customer(self, sale_id):
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				SELECT customer_name
+				FROM sales
+				WHERE sale_id = ?
+			""", (sale_id, ))
+			row = cursor.fetchone()
+			return row["customer_name"] if row else None
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_sale_customer: {e}")
+			return None
+
+	def get_sale_details(self, sale_id):
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				SELECT ci.item_count, i.item_name, ci.item_total, s.payment_method, s.payment_info, s.customer_name
+				FROM items AS i
+				JOIN cart_items AS ci ON i.item_id = ci.item_id
+				JOIN sales AS s ON ci.sale_id = s.sale_id
+				WHERE ci.sale_id = ?
+			""", (sale_id,))
+			return [dict(r) for r in cursor.fetchall()]
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_sale_details: {e}")
+			return []
+
+	def get_cart_session_lines(self, sale_id):
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				SELECT ci.item_id, i.item_name, i.item_price, i.item_stock, ci.item_count
+				FROM cart_items AS ci
+				JOIN items AS i ON i.item_id = ci.item_id
+				WHERE ci.sale_id = ?
+				ORDER BY ci.cart_item_id
+			""", (sale_id,))
+			return [dict(r) for r in cursor.fetchall()]
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_cart_session_lines: {e}")
+			return []
+
 	def get_cart_items(self, sale_id):
 		try:
-			self.apply_discounts(sale_id)
 			cursor = self.conn.cursor()
 			cursor.execute("""
 				SELECT
@@ -255,6 +876,46 @@ class DatabaseManager:
 			print(f"ERROR   : get_cart_items: {e}")
 			return []
 
+	def get_cart_snapshot(self, sale_id):
+		snapshot = {"sale_id": sale_id, "lines": [], "subtotal": 0.0, "discount": 0.0, "total": 0.0}
+		if not sale_id:
+			return snapshot
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				SELECT
+					ci.item_id,
+					ci.item_count,
+					i.item_name,
+					ci.item_discount_perc,
+					ci.item_discount_num,
+					ci.item_total,
+					s.total_discount_num,
+					s.total_amount
+				FROM sales AS s
+				LEFT JOIN cart_items AS ci ON ci.sale_id = s.sale_id
+				LEFT JOIN items AS i ON i.item_id = ci.item_id
+				WHERE s.sale_id = ?
+				ORDER BY ci.cart_item_id
+			""", (sale_id,))
+			for row in cursor.fetchall():
+				snapshot["discount"] = row["total_discount_num"]
+				snapshot["total"] = row["total_amount"]
+				if row["item_id"] is not None:
+					snapshot["lines"].append({
+						"item_id": row["item_id"],
+						"item_count": row["item_count"],
+						"item_name": row["item_name"],
+						"item_discount_perc": row["item_discount_perc"],
+						"item_discount_num": row["item_discount_num"],
+						"item_total": row["item_total"]
+					})
+			snapshot["subtotal"] = snapshot["total"] + snapshot["discount"]
+			return snapshot
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_cart_snapshot: {e}")
+			return snapshot
+
 	def remove_item_from_cart(self, sale_id, i):
 		try:
 			cart_items = get_cart_items(sale_id)
@@ -271,38 +932,40 @@ class DatabaseManager:
 	
 	def remove_cart_of_sale(self, sale_id):
 		try:
+			self.begin_write()
 			cursor = self.conn.cursor()
+			self._rollup_sale(cursor, sale_id, -1)
 			cursor.execute("""
-				UPDATE items
-				SET item_stock = item_stock + (
-					SELECT item_count
-					FROM cart_items
-					WHERE cart_items.item_id = items.item_id
-					AND cart_items.sale_id = ?
-				)
-				WHERE EXISTS (
-					SELECT 1
-					FROM cart_items
-					WHERE cart_items.item_id = items.item_id
-					AND cart_items.sale_id = ?
-				);
-			""", (sale_id, sale_id))
-			self.conn.commit()
-			cursor = self.conn.cursor()
+				SELECT item_id, item_count
+				FROM cart_items
+				WHERE sale_id = ?
+			""", (sale_id, ))
+			self._record_movements(cursor, [(item_id, count, "return", sale_id) for item_id, count in cursor.fetchall()])
+			cursor.execute(f"""
+				SELECT {ITEM_COLUMNS}
+				FROM items
+				WHERE item_id IN (SELECT item_id FROM cart_items WHERE sale_id = ?)
+			""", (sale_id, ))
+			restored = cursor.fetchall()
 			cursor.execute("""
 				DELETE FROM cart_items
 				WHERE sale_id = ?
 			""", (sale_id, ))
-			self.conn.commit()
-			cursor = self.conn.cursor()
 			cursor.execute("""
 				DELETE FROM sales
 				WHERE sale_id = ?
 			""", (sale_id, ))
+			cursor.execute("""
+				DELETE FROM cart_journals
+				WHERE sale_id = ?
+			""", (sale_id, ))
 			self.conn.commit()
+			for row in restored:
+				self.catalog.put(row)
 			print(f"UPDATE  : {sale_id} sale removed.")
 		except Exception as e:
 			print(f"ERROR   : remove_cart_of_sale: {e}")
+			self.conn.rollback()
 
 	def	onhold_orders(self):
 		try:
@@ -349,18 +1012,22 @@ class DatabaseManager:
 		except Exception as e:
 			print("ERROR   : available_campaigns: {e}")
 
-	def get_onhold_sales(self):
+	def get_onhold_sales(self, sale_ids=None):
 		try:
+			clause, params = "", ()
+			if sale_ids is not None:
+				clause = f"AND sale_id IN ({', '.join('?' * len(sale_ids))})"
+				params = tuple(sale_ids)
 			cursor = self.conn.cursor()
-			cursor.execute("""
+			cursor.execute(f"""
 				SELECT
 					sale_id,
 					sale_date,
 					customer_name,
 					total_amount
 				FROM sales
-				WHERE payment_method = "WIP";
-			""")
+				WHERE payment_method = "WIP" {clause};
+			""", params)
 			return cursor.fetchall()
 		except Exception as e:
 			print(f"ERROR   : get_onhold_sales: {e}")
@@ -379,50 +1046,338 @@ class DatabaseManager:
 			print(f"ERROR   : get_sales: {e}")
 			return []
 
+	def _items_filter(self, id_input, name_input, price_input, stock_input):
+		clauses, params = [], []
+		if id_input:
+			clauses.append("CAST(item_id AS TEXT) LIKE '%' || ? || '%'")
+			params.append(id_input)
+		name = turkish_fold(name_input)
+		if len(name) >= 3:
+			# trigram MATCH needs at least three characters; shorter input scans the folded names
+			clauses.append("item_id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+			params.append('"' + name.replace('"', '""') + '"')
+		elif name:
+			clauses.append("item_id IN (SELECT rowid FROM items_fts WHERE item_name LIKE '%' || ? || '%')")
+			params.append(name)
+		for column, text in (("item_price", price_input), ("item_stock", stock_input)):
+			if not text:
+				continue
+			bounds = parse_range(text)
+			if bounds is None:
+				return None
+			for op, value in bounds:
+				clauses.append(f"{column} {op} ?")
+				params.append(value)
+		return " AND ".join(clauses) or "1", params
+
 	def get_filtered_items(self, id_input, name_input, price_input, stock_input):
+		where = self._items_filter(id_input, name_input, price_input, stock_input)
+		if where is None:
+			return []
 		try:
 			cursor = self.conn.cursor()
-			cursor.execute("""
+			cursor.execute(f"""
 				SELECT *
 				FROM items
-				WHERE item_id LIKE '%' || ? || '%'
-				AND item_name LIKE '%' || ? || '%'
-				AND item_price LIKE '%' || ? || '%'
-				AND item_stock LIKE '%' || ? || '%';
-			""", (id_input, name_input, price_input, stock_input))
+				WHERE {where[0]}
+				ORDER BY item_id;
+			""", where[1])
 			return cursor.fetchall()
 		except sqlite3.Error as e:
 			print(f"ERROR   : get_filtered_items: {e}")
 			return []
 
-	def get_filtered_sales(self, date_input, name_input):
+	def get_items_page(self, id_input, name_input, price_input, stock_input, sort_column="item_id", descending=False, after=None, limit=200):
+		# Keyset pagination: "after" is the (sort value, item_id) of the last row shown
+		if sort_column not in ItemRow._fields:
+			sort_column = "item_id"
+		where = self._items_filter(id_input, name_input, price_input, stock_input)
+		if where is None:
+			return []
+		clauses, params = [where[0]], list(where[1])
+		direction, op = ("DESC", "<") if descending else ("ASC", ">")
+		if sort_column == "item_id":
+			order = f"item_id {direction}"
+			if after:
+				clauses.append(f"item_id {op} ?")
+				params.append(after[1])
+		else:
+			order = f"{sort_column} {direction}, item_id {direction}"
+			if after:
+				clauses.append(f"({sort_column}, item_id) {op} (?, ?)")
+				params.extend(after)
+		params.append(limit)
 		try:
 			cursor = self.conn.cursor()
-			cursor.execute("""
-				SELECT *
+			cursor.execute(f"""
+				SELECT {ITEM_COLUMNS}
+				FROM items
+				WHERE {" AND ".join(clauses)}
+				ORDER BY {order}
+				LIMIT ?;
+			""", params)
+			return [dict(r) for r in cursor.fetchall()]
+		except sqlite3.Error as e:
+			# SQLITE_INTERRUPT: a newer search cancelled this page through the progress handler
+			if e.sqlite_errorcode != sqlite3.SQLITE_INTERRUPT:
+				print(f"ERROR   : get_items_page: {e}")
+			return []
+
+	def get_items_by_ids(self, id_input, name_input, price_input, stock_input, item_ids):
+		# The changed rows that still match the stock screen's filters
+		where = self._items_filter(id_input, name_input, price_input, stock_input)
+		if where is None:
+			return []
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute(f"""
+				SELECT {ITEM_COLUMNS}
+				FROM items
+				WHERE {where[0]} AND item_id IN ({", ".join("?" * len(item_ids))});
+			""", [*where[1], *item_ids])
+			return [dict(r) for r in cursor.fetchall()]
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_items_by_ids: {e}")
+			return []
+
+	def refresh_catalog(self, item_ids):
+		# Re-reads items another connection (or till) changed into the shared CATALOG
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute(f"""
+				SELECT {ITEM_COLUMNS}
+				FROM items
+				WHERE item_id IN ({", ".join("?" * len(item_ids))});
+			""", item_ids)
+			self.catalog.refresh(item_ids, cursor.fetchall())
+			return item_ids
+		except sqlite3.Error as e:
+			print(f"ERROR   : refresh_catalog: {e}")
+			return None
+
+	def warm_catalog(self):
+		self.catalog.warm(self)
+		return True
+
+	def _sales_filter(self, period, date_input, name_input):
+		clauses, params = [], []
+		ranges = [period_range(period)]
+		if date_input:
+			typed = parse_date_range(date_input)
+			if typed:
+				ranges.append(typed)
+			else:
+				clauses.append("sale_date LIKE '%' || ? || '%'")
+				params.append(date_input)
+		for bounds in ranges:
+			if bounds:
+				clauses.append("sale_date >= ? AND sale_date < ?")
+				params.extend(bound.isoformat() for bound in bounds)
+		if name_input:
+			clauses.append("customer_name LIKE '%' || ? || '%'")
+			params.append(name_input)
+		return clauses, params
+
+	def get_sales_page(self, period, date_input, name_input, after=None, limit=100):
+		# Keyset pagination on idx_sales_date: "after" is the (sale_date, sale_id) of the last row shown
+		clauses, params = self._sales_filter(period, date_input, name_input)
+		if after:
+			clauses.append("(sale_date, sale_id) < (?, ?)")
+			params.extend(after)
+		params.append(limit)
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute(f"""
+				SELECT sale_id, sale_date, customer_name, total_amount, payment_method
 				FROM sales
-				WHERE sale_date LIKE '%' || ? || '%'
-				AND customer_name LIKE '%' || ? || '%'
-				ORDER BY sale_date DESC;
-			""", (date_input, name_input))
-			rows = cursor.fetchall()
-			return [dict(r) for r in rows]
-		except Exception as e:
-			print(f"ERROR   : get_sales: {e}")
+				WHERE {" AND ".join(clauses) or "1"}
+				ORDER BY sale_date DESC, sale_id DESC
+				LIMIT ?;
+			""", params)
+			return [dict(r) for r in cursor.fetchall()]
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_sales_page: {e}")
+			return []
+
+	def get_sales_by_ids(self, period, date_input, name_input, sale_ids):
+		clauses, params = self._sales_filter(period, date_input, name_input)
+		clauses.append(f"sale_id IN ({', '.join('?' * len(sale_ids))})")
+		params.extend(sale_ids)
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute(f"""
+				SELECT sale_id, sale_date, customer_name, total_amount, payment_method
+				FROM sales
+				WHERE {" AND ".join(clauses)};
+			""", params)
+			return [dict(r) for r in cursor.fetchall()]
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_sales_by_ids: {e}")
 			return []
 
+	def get_revenue_by_payment(self, period="today", date_input=""):
+		# Read from the rollups: one row per hour or day in range, never the sales themselves
+		try:
+			buckets = report_buckets(period, date_input)
+			table, column = ("sales_hourly", "hour") if buckets and buckets[0] else ("sales_daily", "day")
+			cursor = self.conn.cursor()
+			cursor.execute(f"""
+				SELECT payment_method, SUM(sale_count) AS sale_count, ROUND(SUM(revenue), 2) AS revenue, ROUND(SUM(discount), 2) AS discount
+				FROM {table}
+				WHERE {f"{column} >= ? AND {column} < ?" if buckets else "1"}
+				GROUP BY payment_method
+				ORDER BY revenue DESC;
+			""", buckets[1:] if buckets else ())
+			return [dict(r) for r in cursor.fetchall()]
+		except (sqlite3.Error, ValueError) as e:
+			print(f"ERROR   : get_revenue_by_payment: {e}")
+			return []
+
+	def get_revenue_by_hour(self, period="today", date_input=""):
+		try:
+			buckets = report_buckets(period, date_input, hourly=True)
+			cursor = self.conn.cursor()
+			cursor.execute(f"""
+				SELECT hour, SUM(sale_count) AS sale_count, ROUND(SUM(revenue), 2) AS revenue
+				FROM sales_hourly
+				WHERE {"hour >= ? AND hour < ?" if buckets else "1"}
+				GROUP BY hour
+				ORDER BY hour;
+			""", buckets[1:] if buckets else ())
+			return [dict(r) for r in cursor.fetchall()]
+		except (sqlite3.Error, ValueError) as e:
+			print(f"ERROR   : get_revenue_by_hour: {e}")
+			return []
+
+	def get_top_items(self, period="week", date_input="", limit=REPORT_TOP_ITEMS, by="quantity"):
+		# Per-item rollups are daily, so partial days in the range count as whole days
+		order = "revenue" if by == "revenue" else "quantity"
+		try:
+			buckets = report_buckets(period, date_input, hourly=False)
+			cursor = self.conn.cursor()
+			cursor.execute(f"""
+				SELECT r.item_id, i.item_name, SUM(r.quantity) AS quantity, ROUND(SUM(r.revenue), 2) AS revenue, ROUND(SUM(r.discount), 2) AS discount
+				FROM item_sales_daily AS r
+				LEFT JOIN items AS i ON i.item_id = r.item_id
+				WHERE {"r.day >= ? AND r.day < ?" if buckets else "1"}
+				GROUP BY r.item_id
+				ORDER BY {order} DESC, r.item_id
+				LIMIT ?;
+			""", (*(buckets[1:] if buckets else ()), limit))
+			return [dict(r) for r in cursor.fetchall()]
+		except (sqlite3.Error, ValueError) as e:
+			print(f"ERROR   : get_top_items: {e}")
+			return []
+
+	def get_change_seq(self):
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM changes")
+			return cursor.fetchone()[0]
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_change_seq: {e}")
+			return 0
+
+	def get_changes(self, after_seq):
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				SELECT seq, table_name, row_key, op
+				FROM changes
+				WHERE seq > ?
+				ORDER BY seq;
+			""", (after_seq,))
+			return [ChangeRow._make(r) for r in cursor.fetchall()]
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_changes: {e}")
+			return []
+
+	def poll_changes(self, after_seq):
+		# Run on whichever reader is free: the changes log seq and campaign_version
+		# mean the same on every connection, unlike PRAGMA data_version
+		return self.get_campaign_version(), self.get_changes(after_seq)
+
+	def prune_changes(self, keep=CHANGE_LOG_KEEP):
+		try:
+			self.begin_write()
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				DELETE FROM changes
+				WHERE seq <= (SELECT MAX(seq) FROM changes) - ?
+			""", (keep,))
+			self.conn.commit()
+			if cursor.rowcount > 0:
+				print(f"UPDATE  : {cursor.rowcount} old change log entries pruned.")
+		except sqlite3.Error as e:
+			print(f"ERROR   : prune_changes: {e}")
+			self.conn.rollback()
+
+	def _stream(self, row_type, query, params=(), batch_size=STREAM_BATCH_SIZE):
+		cursor = self.conn.cursor()
+		cursor.row_factory = lambda _, row: row_type._make(row)
+		try:
+			cursor.execute(query, params)
+			while True:
+				rows = cursor.fetchmany(batch_size)
+				if not rows:
+					break
+				yield from rows
+		except sqlite3.Error as e:
+			print(f"ERROR   : _stream: {e}")
+		finally:
+			cursor.close()
+
+	def iter_sales(self, period=None, date_input="", name_input="", batch_size=STREAM_BATCH_SIZE):
+		clauses, params = self._sales_filter(period, date_input, name_input)
+		return self._stream(SaleRow, f"""
+			SELECT {SALE_COLUMNS}
+			FROM sales
+			WHERE {" AND ".join(clauses) or "1"}
+			ORDER BY sale_date DESC, sale_id DESC;
+		""", params, batch_size)
+
+	def iter_available_products(self, batch_size=STREAM_BATCH_SIZE):
+		return self._stream(ItemRow, f"""
+			SELECT {ITEM_COLUMNS}
+			FROM items
+			WHERE item_stock > 0
+			ORDER BY item_id;
+		""", (), batch_size)
+
+	def iter_filtered_items(self, id_input="", name_input="", price_input="", stock_input="", batch_size=STREAM_BATCH_SIZE):
+		where = self._items_filter(id_input, name_input, price_input, stock_input)
+		if where is None:
+			return iter(())
+		return self._stream(ItemRow, f"""
+			SELECT {ITEM_COLUMNS}
+			FROM items
+			WHERE {where[0]}
+			ORDER BY item_id;
+		""", where[1], batch_size)
+
 	def	add_new_item(self, id, name, price, stock):
 		try:
+			self.begin_write()
 			cursor = self.conn.cursor()
 			cursor.execute("""
 				INSERT INTO items
 				(item_id, item_name, item_price, item_stock)
 				VALUES
-				(? , ? , ? , ?)
-			""", (id, name, price, stock))
+				(? , ? , ? , 0)
+			""", (id, name, price))
+			self._record_movements(cursor, [(id, stock, "receipt", None)])
+			cursor.execute(f"""
+				SELECT {ITEM_COLUMNS}
+				FROM items
+				WHERE item_id = ?
+			""", (id, ))
+			row = cursor.fetchone()
+			self.conn.commit()
+			self.catalog.put(row)
 			return True
 		except sqlite3.Error as e:
 			print(f"ERROR   : add_new_item: {e}")
+			self.conn.rollback()
 			return False
 
 	def get_item_details(self, id):
@@ -434,7 +1389,7 @@ class DatabaseManager:
 				WHERE item_id = ?
 			""", (id, ))
 			row = cursor.fetchone()
-			return dict(row)
+			return dict(row) if row else []
 		except sqlite3.Error as e:
 			print(f"ERROR   : get_item_detail: {e}")
 			return []
@@ -448,16 +1403,25 @@ class DatabaseManager:
 			print(f"ERRORMSG: update_item: non-float input detected.")
 			return False
 		try:
+			self.begin_write()
 			cursor = self.conn.cursor()
 			cursor.execute("""
 				UPDATE items
 				SET
 				item_name = ?,
-				item_price = ?,
-				item_stock = ?
+				item_price = ?
 				WHERE item_id = ?;
-			""", (name, price, stock, item_id))
+			""", (name, price, item_id))
+			self._adjust_stock_to(cursor, item_id, stock)
+			cursor.execute(f"""
+				SELECT {ITEM_COLUMNS}
+				FROM items
+				WHERE item_id = ?
+			""", (item_id, ))
+			row = cursor.fetchone()
 			self.conn.commit()
+			if row:
+				self.catalog.put(row)
 			print(f"UPDATE  : {item_id} item updated, details:")
 			print(f"  name  : {name}")
 			print(f" price  : {price}")
@@ -465,20 +1429,64 @@ class DatabaseManager:
 			return True
 		except sqlite3.Error as e:
 			print(f"ERROR   : update_item: {e}")
+			self.conn.rollback()
+
+	def update_items(self, edits):
+		# edits: (item_id, column, value) from inline cell edits, written in one transaction
+		by_column = {}
+		for item_id, column, value in edits:
+			if column not in ITEM_EDIT_COLUMNS:
+				print(f"ERROR   : update_items: '{column}' is not editable.")
+				return None
+			by_column.setdefault(column, []).append((value, item_id))
+		item_ids = list(dict.fromkeys(item_id for item_id, _, _ in edits))
+		try:
+			self.begin_write()
+			cursor = self.conn.cursor()
+			for column, values in by_column.items():
+				if column == "item_stock":
+					for stock, item_id in values:
+						self._adjust_stock_to(cursor, item_id, stock)
+					continue
+				cursor.executemany(f"""
+					UPDATE items
+					SET {column} = ?
+					WHERE item_id = ?
+				""", values)
+			cursor.execute(f"""
+				SELECT {ITEM_COLUMNS}
+				FROM items
+				WHERE item_id IN ({", ".join("?" * len(item_ids))})
+			""", item_ids)
+			rows = cursor.fetchall()
+			self.conn.commit()
+			for row in rows:
+				self.catalog.put(row)
+			print(f"UPDATE  : {len(edits)} item fields updated on {len(rows)} items.")
+			return [dict(r) for r in rows]
+		except sqlite3.Error as e:
+			print(f"ERROR   : update_items: {e}")
+			self.conn.rollback()
+			return None
 
 	def remove_item(self, id):
 		try:
+			self.begin_write()
 			cursor = self.conn.cursor()
 			cursor.execute("""
 				DELETE FROM items
 				WHERE item_id = ?
 			""", (id, ))
 			self.conn.commit()
+			self.catalog.discard(id)
 			print(f"UPDATE  : {id} item deleted.")
+			return True
 		except sqlite3.Error as e:
 			print(f"ERROR   : remove_item: {e}")
+			self.conn.rollback()
+			return False
 		
-	def check_item_available(self, id):
+	def check_item_available(self, id, count=1):
 		try:
 			cursor = self.conn.cursor()
 			cursor.execute("""
@@ -486,8 +1494,8 @@ class DatabaseManager:
 				FROM items
 				WHERE item_id = ?
 			""", (id, ))
-			count = cursor.fetchone()
-			if (count[0] > 0):
+			stock = cursor.fetchone()
+			if (stock and stock[0] >= count):
 				return True
 			else:
 				return False
@@ -495,20 +1503,554 @@ class DatabaseManager:
 			print(f"ERROR   : check_item_available: {e}")
 			return False
 
-	def decrease_item_stock(self, id):
+	def decrease_item_stock(self, id, count=1):
 		try:
+			self.begin_write()
 			cursor = self.conn.cursor()
-			cursor.execute("""
-				UPDATE items
-				SET item_stock = item_stock - 1.0
+			self._record_movements(cursor, [(id, -count, "adjustment", None)])
+			cursor.execute(f"""
+				SELECT {ITEM_COLUMNS}
+				FROM items
 				WHERE item_id = ?
 			""", (id, ))
+			row = cursor.fetchone()
 			self.conn.commit()
+			if row:
+				self.catalog.put(row)
 		except sqlite3.Error as e:
 			print(f"ERROR   : decrease_item_stock: {e}")
+			self.conn.rollback()
+
+	def get_stock_history(self, item_id, limit=100):
+		# Newest first, each movement with the balance it left behind
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				SELECT
+					m.movement_id,
+					m.moved_at,
+					m.reason,
+					m.delta,
+					m.sale_id,
+					m.terminal_id,
+					i.item_stock - COALESCE(SUM(m.delta) OVER (
+						ORDER BY m.movement_id DESC
+						ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+					), 0) AS balance
+				FROM stock_movements AS m
+				JOIN items AS i ON i.item_id = m.item_id
+				WHERE m.item_id = ?
+				ORDER BY m.movement_id DESC
+				LIMIT ?;
+			""", (item_id, limit))
+			return [dict(r) for r in cursor.fetchall()]
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_stock_history: {e}")
+			return []
+
+	def get_stock_balance_at(self, item_id, moment):
+		# Latest snapshot at or before the moment plus the movements still in the
+		# ledger up to it; inside a compacted range that is snapshot precision. With
+		# no snapshot yet, walk back from the current balance. None when the moment
+		# is older than the item's first snapshot: those movements are gone.
+		moment = moment.isoformat()
+		try:
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				SELECT balance, as_of
+				FROM stock_snapshots
+				WHERE item_id = ?
+				ORDER BY as_of <= ? DESC, as_of DESC, movement_id DESC
+				LIMIT 1
+			""", (item_id, moment))
+			snapshot = cursor.fetchone()
+			if snapshot and snapshot["as_of"] > moment:
+				return None
+			if snapshot:
+				cursor.execute("""
+					SELECT ? + COALESCE(SUM(delta), 0)
+					FROM stock_movements
+					WHERE item_id = ? AND moved_at <= ?
+				""", (snapshot["balance"], item_id, moment))
+			else:
+				cursor.execute("""
+					SELECT i.item_stock - COALESCE(SUM(m.delta), 0)
+					FROM items AS i
+					LEFT JOIN stock_movements AS m
+						ON m.item_id = i.item_id AND m.moved_at > ?
+					WHERE i.item_id = ?
+				""", (moment, item_id))
+			row = cursor.fetchone()
+			return row[0] if row else None
+		except sqlite3.Error as e:
+			print(f"ERROR   : get_stock_balance_at: {e}")
+			return None
+
+	def compact_stock_movements(self, keep_days=STOCK_HISTORY_DAYS):
+		# Folds movements older than keep_days into one snapshot per item, so the
+		# ledger that history reads walk stays bounded. Tills interleave their
+		# movement_ids, so what to fold is decided by moved_at, and each snapshot is
+		# stamped with the newest moved_at it really contains.
+		cutoff = (datetime.now() - timedelta(days=keep_days)).isoformat()
+		try:
+			self.begin_write()
+			cursor = self.conn.cursor()
+			cursor.execute("""
+				INSERT INTO stock_snapshots (item_id, movement_id, balance, as_of)
+				SELECT
+					m.item_id,
+					MAX(m.movement_id),
+					COALESCE((
+						SELECT s.balance
+						FROM stock_snapshots AS s
+						WHERE s.item_id = m.item_id
+						ORDER BY s.as_of DESC, s.movement_id DESC
+						LIMIT 1
+					), 0) + SUM(m.delta),
+					MAX(m.moved_at)
+				FROM stock_movements AS m
+				WHERE m.moved_at < ?
+				GROUP BY m.item_id;
+			""", (cutoff, ))
+			cursor.execute("""
+				DELETE FROM stock_movements
+				WHERE moved_at < ?
+			""", (cutoff, ))
+			folded = cursor.rowcount
+			self.conn.commit()
+			if folded:
+				print(f"UPDATE  : {folded} stock movements compacted into snapshots.")
+			return folded
+		except sqlite3.Error as e:
+			print(f"ERROR   : compact_stock_movements: {e}")
+			self.conn.rollback()
+			return 0
+
+class ConnectionManager:
+	# One DatabaseManager, and so one sqlite3 connection, per thread that asks
+	# for it; campaign_index is per connection as well.
+	def __init__(self, profile=DEFAULT_PROFILE, db_name=DB_NAME, terminal_id=TERMINAL_ID):
+		self.profile = profile
+		if terminal_id not in TERMINAL_IDS:
+			raise ValueError(f"terminal_id must be 1-9, got {terminal_id!r}")
+		self.db_name = db_name
+		self.terminal_id = terminal_id
+		self.local = threading.local()
+		self.managers = []
+		self.lock = threading.Lock()
+
+	def get(self):
+		manager = getattr(self.local, "manager", None)
+		if manager is None:
+			manager = DatabaseManager(self.profile, self.db_name, self.terminal_id)
+			self.local.manager = manager
+			with self.lock:
+				self.managers.append(manager)
+		return manager
+
+	def busy_retries(self):
+		with self.lock:
+			return sum(manager.busy_retries for manager in self.managers)
+
+	def close_all(self):
+		with self.lock:
+			managers, self.managers = self.managers, []
+		for manager in managers:
+			manager.close()
+
+class DatabaseWorker(QObject):
+	completed = Signal(object, object, object, object)
+
+	def __init__(self, connections, readers=2):
+		super().__init__()
+		self.connections = connections
+		self.tokens = {}
+		self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+		self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-reader")
+		self.completed.connect(self._deliver)
+
+	def _manager(self):
+		return self.connections.get()
+
+	def _run(self, method, args, callback, key, token, cancel):
+		manager = self._manager()
+		if cancel is not None:
+			if cancel.is_set():
+				return None
+			# SQLite polls this every N VM steps and aborts the statement once it is set
+			manager.conn.set_progress_handler(cancel.is_set, 1000)
+		try:
+			result = getattr(manager, method)(*args)
+		except Exception as e:
+			if cancel is None or not cancel.is_set():
+				print(f"ERROR   : DatabaseWorker: {method}: {e}")
+			result = None
+		finally:
+			if cancel is not None:
+				manager.conn.set_progress_handler(None, 0)
+		if cancel is not None and cancel.is_set():
+			return None
+		if callback:
+			self.completed.emit(callback, result, key, token)
+		return result
+
+	def _deliver(self, callback, result, key, token):
+		if key is not None and self.tokens.get(key) != token:
+			return
+		callback(result)
+
+	def _submit(self, executor, method, args, callback, key, cancel=None):
+		token = None
+		if key is not None:
+			token = self.tokens[key] = self.tokens.get(key, 0) + 1
+		return executor.submit(self._run, method, args, callback, key, token, cancel)
+
+	def read(self, method, *args, callback=None, key=None, cancel=None):
+		return self._submit(self.readers, method, args, callback, key, cancel)
+
+	def write(self, method, *args, callback=None, key=None):
+		return self._submit(self.writer, method, args, callback, key)
+
+	def shutdown(self):
+		self.writer.shutdown(wait=True)
+		self.readers.shutdown(wait=True)
+		self.connections.close_all()
+
+# fsyncs cart journals off the UI thread; one thread keeps each journal's syncs in order
+JOURNAL_SYNC_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal-sync")
+
+def read_cart_journal(path):
+	# Header dict and (seq, item_id, item_count) entries; a torn last line ends the read
+	header, entries = {}, []
+	with open(path, encoding="utf-8") as journal:
+		for raw in journal:
+			try:
+				entry = json.loads(raw)
+			except json.JSONDecodeError:
+				break
+			if "sale_id" in entry:
+				header = entry
+			else:
+				entries.append((entry.get("seq", len(entries) + 1), entry["item_id"], entry["item_count"]))
+	return header, entries
+
+class CartSession:
+	def __init__(self, sale_id, customer_name, lines=(), journal_dir=JOURNAL_DIR):
+		self.sale_id = sale_id
+		self.customer_name = customer_name
+		self.lines = {}
+		self.committing = False
+		self.sync_lock = threading.Lock()
+		self.sync_pending = False
+		for line in lines:
+			self.lines[line["item_id"]] = dict(line, persisted_count=line["item_count"])
+		os.makedirs(journal_dir, exist_ok=True)
+		self.journal_path = os.path.join(journal_dir, f"{sale_id}.journal")
+		# Entries are numbered per session; commits store (session, seq) next to the
+		# cart rows, which is how recovery tells saved entries from unsaved ones
+		if os.path.exists(self.journal_path):
+			header, entries = read_cart_journal(self.journal_path)
+			self.session = header.get("session", "")
+			self.seq = entries[-1][0] if entries else 0
+			self.journal = open(self.journal_path, "a", encoding="utf-8")
+		else:
+			self.session = uuid.uuid4().hex
+			self.seq = 0
+			self.journal = open(self.journal_path, "a", encoding="utf-8")
+			self._append({"sale_id": sale_id, "customer_name": customer_name, "session": self.session})
+
+	def _append(self, entry):
+		# The flush hands the entry to the OS, which survives the app crashing; the
+		# fsync for power loss runs on JOURNAL_SYNC_POOL, one per burst of taps
+		self.journal.write(json.dumps(entry) + "\n")
+		self.journal.flush()
+		with self.sync_lock:
+			if self.sync_pending:
+				return
+			self.sync_pending = True
+		JOURNAL_SYNC_POOL.submit(self._sync)
+
+	def _sync(self):
+		# Syncs a duplicate descriptor outside the lock, so taps and close never wait on the disk
+		with self.sync_lock:
+			self.sync_pending = False
+			if self.journal.closed:
+				return
+			fd = os.dup(self.journal.fileno())
+		try:
+			os.fsync(fd)
+		finally:
+			os.close(fd)
+
+	def close_journal(self):
+		with self.sync_lock:
+			if not self.journal.closed:
+				self.journal.close()
+
+	def available(self, item_id):
+		line = self.lines.get(item_id)
+		if not line:
+			return None
+		return line["item_stock"] - (line["item_count"] - line["persisted_count"])
+
+	def reserve(self, catalog, item_id, item_count=1):
+		# Runs on every tap, so it only looks at the catalog; an item missing there was removed
+		if self.committing:
+			return None
+		line = self.lines.get(item_id)
+		if not line:
+			details = catalog.get(item_id)
+			if not details:
+				return None
+			line = {
+				"item_id": item_id,
+				"item_name": details.item_name,
+				"item_price": details.item_price,
+				"item_stock": details.item_stock,
+				"item_count": 0,
+				"persisted_count": 0
+			}
+		if line["item_stock"] - (line["item_count"] - line["persisted_count"]) < item_count:
+			return None
+		line["item_count"] += item_count
+		self.lines[item_id] = line
+		self.seq += 1
+		self._append({"seq": self.seq, "item_id": item_id, "item_count": item_count})
+		return line
+
+	def reservations(self):
+		return [
+			(item_id, line["item_count"] - line["persisted_count"])
+			for item_id, line in self.lines.items()
+			if line["item_count"] > line["persisted_count"]
+		]
+
+	def refresh_stock(self, catalog, item_ids=None):
+		# Lines keep the stock read when they were added; another till's sale moves it
+		for item_id, line in self.lines.items():
+			if item_ids is None or item_id in item_ids:
+				line["item_stock"] = catalog.stock(item_id)
+
+	def trim_to_stock(self, catalog):
+		# After a commit was refused for stock: unsaved counts are cut to what is left,
+		# journaled as negative entries so recovery restores the trimmed cart
+		self.refresh_stock(catalog)
+		trimmed = []
+		for item_id, line in list(self.lines.items()):
+			excess = line["item_count"] - line["persisted_count"] - max(line["item_stock"], 0)
+			if excess <= 0:
+				continue
+			line["item_count"] -= excess
+			if not line["item_count"]:
+				del self.lines[item_id]
+			self.seq += 1
+			self._append({"seq": self.seq, "item_id": item_id, "item_count": -excess})
+			trimmed.append((line["item_name"], excess))
+		return trimmed
+
+	def begin_commit(self):
+		# Counts the unsaved lines as saved from the moment they are submitted, so a
+		# second hold/pay cannot send them again; end_commit(False, ...) undoes it
+		reservations = self.reservations()
+		for item_id, count in reservations:
+			self.lines[item_id]["persisted_count"] += count
+		self.committing = True
+		return reservations, (self.session, self.seq)
+
+	def end_commit(self, ok, reservations):
+		self.committing = False
+		if not ok:
+			for item_id, count in reservations:
+				self.lines[item_id]["persisted_count"] -= count
+
+	def snapshot(self, campaign_index):
+		snapshot = {"sale_id": self.sale_id, "lines": [], "subtotal": 0.0, "discount": 0.0, "total": 0.0}
+		for item_id, line in self.lines.items():
+			discount_perc, discount_num, line_total = campaign_index.price_line(item_id, line["item_count"], line["item_price"])
+			snapshot["lines"].append({
+				"item_id": item_id,
+				"item_count": line["item_count"],
+				"item_name": line["item_name"],
+				"item_discount_perc": discount_perc,
+				"item_discount_num": discount_num,
+				"item_total": line_total
+			})
+			snapshot["discount"] += discount_num
+			snapshot["total"] += line_total
+		snapshot["subtotal"] = snapshot["total"] + snapshot["discount"]
+		return snapshot
+
+	def close(self):
+		self.close_journal()
+		if os.path.exists(self.journal_path):
+			os.remove(self.journal_path)
+
+def recover_cart_journals(db, journal_dir=JOURNAL_DIR):
+	if not os.path.isdir(journal_dir):
+		return
+	for name in sorted(os.listdir(journal_dir)):
+		if not name.endswith(".journal"):
+			continue
+		path = os.path.join(journal_dir, name)
+		header, entries = read_cart_journal(path)
+		sale_id = header.get("sale_id")
+		applied = db.replay_cart_journal(sale_id, header.get("session", ""), entries) if sale_id else None
+		if applied is None:
+			print(f"ERROR   : recover_cart_journals: {path} could not be restored.")
+			os.replace(path, path + ".failed")
+			continue
+		if applied:
+			print(f"RECOVER : {sale_id} unsaved cart restored as an on-hold sale ({applied} lines).")
+		else:
+			print(f"RECOVER : {sale_id} journal was already saved.")
+		os.remove(path)
+
+class CartState(QObject):
+	snapshot_changed = Signal(object)
+
+	def __init__(self, app_data):
+		super().__init__()
+		self.app_data = app_data
+		self.snapshot = None
+		# Loaded by CatalogSync on a reader thread; open carts are priced from this copy
+		self.campaign_index = CampaignIndex()
+
+	def set_campaign_index(self, campaign_index):
+		if campaign_index is None:
+			return
+		self.campaign_index = campaign_index
+		if self.app_data.cart_session:
+			self.refresh()
+
+	def refresh(self):
+		session = self.app_data.cart_session
+		if session and session.sale_id == self.app_data.curr_sale_id:
+			self._publish(session.snapshot(self.campaign_index))
+			return
+		self.app_data.db_worker.read(
+			"get_cart_snapshot", self.app_data.curr_sale_id,
+			callback=self._publish, key="cart_snapshot"
+		)
+
+	def _publish(self, snapshot):
+		self.snapshot = snapshot
+		self.snapshot_changed.emit(snapshot)
+
+class CatalogSync(QObject):
+	catalog_changed = Signal(object)
+
+	# Writes from this process update CATALOG themselves; those of other tills only
+	# show up in the changes log. catalog_changed carries the item ids, None for all.
+	def __init__(self, app_data):
+		super().__init__()
+		self.app_data = app_data
+		app_data.changes.items_changed.connect(self.refresh)
+		app_data.changes.log_truncated.connect(self.rewarm)
+		app_data.changes.campaigns_changed.connect(self.reload_campaigns)
+
+	def refresh(self, changes):
+		item_ids = list({change.row_key for change in changes})
+		self.app_data.db_worker.read("refresh_catalog", item_ids, callback=self._refreshed)
+
+	def rewarm(self):
+		self.app_data.db_worker.read("warm_catalog", callback=self._refreshed)
+
+	def reload_campaigns(self):
+		self.app_data.db_worker.read(
+			"get_campaign_snapshot",
+			callback=self.app_data.cart_state.set_campaign_index, key="campaign_index"
+		)
+
+	def _refreshed(self, item_ids):
+		if item_ids is True:
+			self.catalog_changed.emit(None)
+		elif item_ids:
+			self.catalog_changed.emit(item_ids)
+
+class ChangeDispatcher(QObject):
+	items_changed = Signal(object)
+	sales_changed = Signal(object)
+	log_truncated = Signal()
+	campaigns_changed = Signal()
+
+	# Polls the changes log through the db_worker's readers and emits from the
+	# callback, so the UI thread never waits on SQLite. poll() may be called at
+	# any time; it is a no-op while a poll is already in flight.
+	def __init__(self, db_worker, interval=CHANGE_POLL_INTERVAL):
+		super().__init__()
+		self.db_worker = db_worker
+		self.seq = 0
+		self.campaign_version = None
+		self.polling = True
+		self.signals = {"items": self.items_changed, "sales": self.sales_changed}
+		db_worker.write("prune_changes")
+		db_worker.read("get_change_seq", callback=self._started)
+		self.timer = QTimer(self)
+		self.timer.setInterval(interval)
+		self.timer.timeout.connect(self.poll)
+		self.timer.start()
+
+	def _started(self, seq):
+		self.seq = seq
+		self.polling = False
+		self.poll()
+
+	def poll(self):
+		if self.polling:
+			return
+		self.polling = True
+		self.db_worker.read("poll_changes", self.seq, callback=self._polled)
+
+	def _polled(self, result):
+		self.polling = False
+		if not result:
+			return
+		campaign_version, changes = result
+		# campaigns are not in the changes log; triggers bump campaign_version instead
+		if campaign_version is not None and campaign_version != self.campaign_version:
+			self.campaign_version = campaign_version
+			self.campaigns_changed.emit()
+		if not changes:
+			return
+		truncated = changes[0].seq != self.seq + 1
+		self.seq = changes[-1].seq
+		if truncated:
+			# Another terminal pruned entries we never saw; deltas can't be trusted
+			self.log_truncated.emit()
+			return
+		by_table = {}
+		for change in changes:
+			by_table.setdefault(change.table_name, []).append(change)
+		for table_name, table_changes in by_table.items():
+			self.signals[table_name].emit(table_changes)
+
+	def close(self):
+		self.timer.stop()
 
 class AppData:
-	def __init__(self):
-		self.database_manager = DatabaseManager()
+	def __init__(self, db_profile=DEFAULT_PROFILE):
+		self.terminal_id = TERMINAL_ID
+		self.connections = ConnectionManager(db_profile)
+		# The UI thread's connection; worker threads get their own from the same manager
+		self.database_manager = self.connections.get()
+		self.db_worker = DatabaseWorker(self.connections)
 		self.curr_sale_id = None
 		self.curr_customer_name = ""
+		self.cart_session = None
+		self.cart_state = CartState(self)
+		self.catalog = CATALOG
+		self.changes = ChangeDispatcher(self.db_worker)
+		self.catalog_sync = CatalogSync(self)
+
+	def open_cart_session(self, sale_id, customer_name, lines=()):
+		if self.cart_session and self.cart_session.sale_id != sale_id:
+			self.cart_session.close_journal()
+		self.cart_session = CartSession(sale_id, customer_name, lines)
+		self.curr_sale_id = sale_id
+		self.curr_customer_name = customer_name
+		return self.cart_session
+
+	def close_cart_session(self):
+		if self.cart_session:
+			self.cart_session.close()
+			self.cart_session = None
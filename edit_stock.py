@@ -1,11 +1,21 @@
+import threading
 from PySide6.QtWidgets import (
-	QWidget, QVBoxLayout, QPushButton, QLabel,
-	QScrollArea, QDialog, QTableWidget, QTableWidgetItem, QHeaderView,
-	QHBoxLayout, QSpacerItem, QSizePolicy, QLineEdit, QCheckBox, QFrame
+	QWidget, QVBoxLayout, QPushButton, QLabel, QHeaderView,
+	QHBoxLayout, QSizePolicy, QLineEdit, QTableView,
+	QStyledItemDelegate, QStyleOptionViewItem, QStyle, QMessageBox
 )
-from PySide6.QtGui import QPixmap, QIcon, QPainter, QColor
-from PySide6.QtCore import Qt, Signal, QTimer, QSize
-from data import AppData
+from PySide6.QtGui import QPainter, QColor
+from PySide6.QtCore import Qt, Signal, QTimer, QSize, QAbstractTableModel, QModelIndex, QRectF
+from data import AppData, ItemRow, ITEM_EDIT_COLUMNS, sorted_position
+import theme
+
+STOCK_PAGE_SIZE = 200
+STOCK_COLUMNS = ItemRow._fields
+STOCK_HEADERS = ("Ürün Kodu", "Ürün Adı", "Fiyat", "Stok", "")
+REMOVE_COLUMN = 4
+ITEM_ROLE = Qt.UserRole
+EDIT_FLUSH_DELAY = 500
+SEARCH_DELAY = 250
 
 class InfoBoxWidget(QWidget):
 	def __init__(self, message: str, icon_type: str = 'warning', parent=None):
@@ -29,7 +39,7 @@ class InfoBoxWidget(QWidget):
 		self.layout.addWidget(self.message_label)
 		self.current_style_config = self.get_style_config(icon_type)
 		self.set_icon(icon_type)
-		self.apply_style()
+		self.setProperty("kind", icon_type)
 		self.setAttribute(Qt.WidgetAttribute.WA_NoMousePropagation, True)
 
 	def paintEvent(self, event):
@@ -54,21 +64,18 @@ class InfoBoxWidget(QWidget):
 			return {
 				'bg_color': "#FFF3CD",
 				'border_color': "#FFE0A8",
-				'text_color': "#664D03",
 				'border_radius': 8
 			}
 		elif icon_type == 'information':
 			return {
 				'bg_color': "#CCE5FF",
 				'border_color': "#A9D5FA",
-				'text_color': "#004085",
 				'border_radius': 8
 			}
 		else:
 			return {
 				'bg_color': "#E9E9E9",
 				'border_color': "#C0C0C0",
-				'text_color': "#000000",
 				'border_radius': 8
 			}
 
@@ -83,177 +90,279 @@ class InfoBoxWidget(QWidget):
 		pixmap = icon.pixmap(QSize(56, 56)) 
 		self.icon_label.setPixmap(pixmap)
 
-	def apply_style(self):
-		text_color = self.current_style_config['text_color']
-		
-		style_sheet = f"""
-			QLabel {{
-				color: {text_color};
-				font-size: 20px;
-				font-weight: 700;
-				background-color: transparent;
-			}}
-		"""
-		self.setStyleSheet(style_sheet)
-
-class ItemEditDialog(QDialog):
-	def __init__(self, item_id, db, parent=None):
+class StockTableModel(QAbstractTableModel):
+	page_loaded = Signal()
+	edit_failed = Signal(str)
+
+	def __init__(self, db_worker, changes, page_size=STOCK_PAGE_SIZE, parent=None):
 		super().__init__(parent)
-		self.setWindowTitle(f"Ürün {item_id} düzenleniyor:")
-		self.setStyleSheet("background-color: #111; color: #e9eaf2;")
-
-		details = db.get_item_details(item_id)
-
-		layout = QVBoxLayout()
-		self.setLayout(layout)
-
-		self.labelstyle = """
-			font-size: 20px;
-			font-weight: bold;
-			color: #e9eaf2;
-		"""
-
-		self.inputstyle = """
-			QLineEdit {
-				font-size: 20px;
-				padding: 6px;
-				background-color: #011f26;
-				color: #e9eaf2;
-				border: 2px solid #e9eaf2;
-				border-radius: 12px;
-			}
-		"""
-
-		input_boxes_layout = QVBoxLayout()
-		input_boxes_layout.setAlignment(Qt.AlignTop)
-
-		name_label = QLabel("Ürün Adı:")
-		name_label.setStyleSheet(self.labelstyle)
-		self.name_edit = QLineEdit()
-		self.name_edit.setPlaceholderText("Ürün Adı")
-		self.name_edit.setText(details["item_name"])
-		self.name_edit.setStyleSheet(self.inputstyle)
-		self.name_edit.setMaxLength(32)
-
-		price_label = QLabel("Ürün Fiyatı:")
-		price_label.setStyleSheet(self.labelstyle)
-		self.price_edit = QLineEdit()
-		self.name_edit.setPlaceholderText("Ürün Fiyatı")
-		self.price_edit.setText(str(details["item_price"]))
-		self.price_edit.setStyleSheet(self.inputstyle)
-		self.price_edit.setMaxLength(32)
-	
-		stock_label = QLabel("Ürün Stoğu:")
-		stock_label.setStyleSheet(self.labelstyle)
-		self.stock_edit = QLineEdit()
-		self.name_edit.setPlaceholderText("Ürün Stoğu")
-		self.stock_edit.setText(str(details["item_stock"]))
-		self.stock_edit.setStyleSheet(self.inputstyle)
-		self.stock_edit.setMaxLength(32)
-
-		warning_box = InfoBoxWidget("Varolan ürünün kodu doğrudan değiştirilemez.", icon_type="information")
-		warning_box.setSizePolicy(
-			QSizePolicy.Policy.MinimumExpanding,
-			QSizePolicy.Policy.Fixed
+		self.db_worker = db_worker
+		self.changes = changes
+		self.page_size = page_size
+		self.key = f"stock_page:{id(self)}"
+		self.filters = None
+		self.sort_section = 0
+		self.descending = False
+		self.items = []
+		self.positions = {}
+		self.after = None
+		self.exhausted = True
+		self.loading = False
+		self.cancel_page = None
+		self.seen_seq = 0
+		self.generation = 0
+		self.dirty = {}
+		self.pending = {}
+		self.flush_timer = QTimer(self)
+		self.flush_timer.setSingleShot(True)
+		self.flush_timer.setInterval(EDIT_FLUSH_DELAY)
+		self.flush_timer.timeout.connect(self.flush_edits)
+		changes.items_changed.connect(self.apply_changes)
+		changes.log_truncated.connect(self.reload)
+
+	def set_filters(self, id_input, name_input, price_input, stock_input):
+		# Unchanged filters only need the deltas logged since the last load
+		self.changes.poll()
+		if self.filters == (id_input, name_input, price_input, stock_input):
+			return
+		self.filters = (id_input, name_input, price_input, stock_input)
+		self.reload()
+
+	def reload(self):
+		if self.filters is None:
+			return
+		self.flush_edits()
+		if self.cancel_page is not None:
+			# Aborts a page query of the previous filters that is still running
+			self.cancel_page.set()
+		self.beginResetModel()
+		self.items = []
+		self.positions = {}
+		self.after = None
+		self.exhausted = False
+		self.loading = False
+		self.seen_seq = self.changes.seq
+		self.generation += 1
+		self.dirty = {}
+		self.endResetModel()
+		self.fetchMore(QModelIndex())
+
+	def apply_changes(self, changes):
+		if self.filters is None:
+			return
+		for change in changes:
+			if change.seq > self.seen_seq:
+				self.dirty[change.row_key] = None
+		self.seen_seq = max(self.seen_seq, changes[-1].seq)
+		if not self.dirty:
+			return
+		# Each read covers every row still dirty, so a newer one can supersede an older one
+		item_ids = list(self.dirty)
+		self.db_worker.read(
+			"get_items_by_ids", *self.filters, item_ids,
+			callback=lambda rows, generation=self.generation: self._patch(generation, item_ids, rows),
+			key=f"stock_patch:{id(self)}"
 		)
 
-		buttons_layout = QHBoxLayout()
-		buttons_layout.setAlignment(Qt.AlignRight)
+	def sort_key(self, item):
+		return item[STOCK_COLUMNS[self.sort_section]], item["item_id"]
+
+	def _patch(self, generation, item_ids, rows):
+		if generation != self.generation:
+			return
+		matched = {row["item_id"]: row for row in rows or []}
+		for (item_id, column), value in self.pending.items():
+			if item_id in matched:
+				matched[item_id][column] = value
+		for item_id in item_ids:
+			self.dirty.pop(item_id, None)
+			row = matched.get(item_id)
+			position = self.positions.get(item_id)
+			if position is not None and row and self.sort_key(self.items[position]) == self.sort_key(row):
+				self.items[position] = row
+				self.dataChanged.emit(self.index(position, 0), self.index(position, len(STOCK_COLUMNS) - 1))
+				continue
+			if position is not None:
+				self.beginRemoveRows(QModelIndex(), position, position)
+				del self.items[position]
+				self.endRemoveRows()
+			if row:
+				position = sorted_position(self.items, self.sort_key, self.sort_key(row), self.descending)
+				# Rows past the last loaded one arrive with a later page
+				if position < len(self.items) or self.exhausted:
+					self.beginInsertRows(QModelIndex(), position, position)
+					self.items.insert(position, row)
+					self.endInsertRows()
+			self.positions = {item["item_id"]: i for i, item in enumerate(self.items)}
+		self.page_loaded.emit()
+
+	def sort(self, column, order=Qt.AscendingOrder):
+		descending = order == Qt.DescendingOrder
+		if column >= len(STOCK_COLUMNS) or (column, descending) == (self.sort_section, self.descending):
+			return
+		self.sort_section = column
+		self.descending = descending
+		self.reload()
 
-		trash_icon = self.style().standardIcon(
-			self.style().StandardPixmap.SP_TrashIcon
+	def canFetchMore(self, parent=QModelIndex()):
+		return not parent.isValid() and not self.exhausted and not self.loading
+
+	def fetchMore(self, parent=QModelIndex()):
+		if not self.canFetchMore(parent):
+			return
+		self.loading = True
+		self.cancel_page = threading.Event()
+		self.db_worker.read(
+			"get_items_page", *self.filters, STOCK_COLUMNS[self.sort_section], self.descending, self.after, self.page_size,
+			callback=self._append_page, key=self.key, cancel=self.cancel_page
 		)
-		icon_size = QSize(28, 28) 
-
-		self.remove_button = QPushButton("")
-		self.remove_button.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 6px;
-				border-radius: 12px;
-				border: 2px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
-		self.remove_button.setIcon(trash_icon)
-		self.remove_button.setIconSize(icon_size)
-		self.remove_button.clicked.connect(lambda:{
-			db.remove_item(item_id),
-			self.accept()
-		})
-		buttons_layout.addWidget(self.remove_button)
-
-		self.cancel_button = QPushButton("Vazgeç")
-		self.cancel_button.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 6px;
-				border-radius: 12px;
-				border: 2px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
-		self.cancel_button.clicked.connect(lambda:{
-			self.accept()
-		})
-		buttons_layout.addWidget(self.cancel_button)
-
-		self.complete_button = QPushButton("Tamamla")
-		self.complete_button.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 6px;
-				border-radius: 12px;
-				border: 2px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
-		self.complete_button.clicked.connect(lambda: (
-			(success := db.update_item(
-				item_id, 
-				self.name_edit.text().strip(),
-				self.price_edit.text().strip(),
-				self.stock_edit.text().strip()
-			)),
-			self.accept() if success
-			else print("ItemEditDialog: non-float input detected.")
-		))
-		buttons_layout.addWidget(self.complete_button, stretch=1)
-
-		input_boxes_layout.addWidget(name_label)
-		input_boxes_layout.addWidget(self.name_edit)
-		input_boxes_layout.addWidget(price_label)
-		input_boxes_layout.addWidget(self.price_edit)
-		input_boxes_layout.addWidget(stock_label)
-		input_boxes_layout.addWidget(self.stock_edit)
-
-		layout.addWidget(warning_box)
-		layout.addLayout(input_boxes_layout)
-		layout.addLayout(buttons_layout)
-
-		self.name_edit.returnPressed.connect(self.complete_button.click)
-		self.price_edit.returnPressed.connect(self.complete_button.click)
-		self.stock_edit.returnPressed.connect(self.complete_button.click)
-
-		self.resize(600, 600)
-		self.setMinimumSize(600, 600)
-
-		self.setLayout(layout)
+
+	def _append_page(self, page):
+		self.loading = False
+		page = page or []
+		if len(page) < self.page_size:
+			self.exhausted = True
+		if page:
+			# The cursor comes from the rows as read, so local edits to the sort column don't shift it
+			self.after = (page[-1][STOCK_COLUMNS[self.sort_section]], page[-1]["item_id"])
+			self.beginInsertRows(QModelIndex(), len(self.items), len(self.items) + len(page) - 1)
+			for item in page:
+				self.positions[item["item_id"]] = len(self.items)
+				self.items.append(item)
+			self.endInsertRows()
+		self.page_loaded.emit()
+
+	def rowCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else len(self.items)
+
+	def columnCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else len(STOCK_HEADERS)
+
+	def headerData(self, section, orientation, role=Qt.DisplayRole):
+		if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+			return STOCK_HEADERS[section]
+		return None
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		item = self.items[index.row()]
+		column = index.column()
+		if role == Qt.DisplayRole:
+			if column == 0:
+				return str(item["item_id"])
+			if column == 1:
+				return item["item_name"]
+			if column == 2:
+				return f"{item['item_price']:.2f}₺"
+			if column == 3:
+				return f"{item['item_stock']} ad."
+			if column == REMOVE_COLUMN:
+				return "Sil"
+		if role == Qt.EditRole:
+			if column == 1:
+				return item["item_name"]
+			if column == 2:
+				return f"{item['item_price']:.2f}"
+			if column == 3:
+				return str(item["item_stock"])
+		if role == Qt.TextAlignmentRole:
+			if column in (2, 3):
+				return int(Qt.AlignRight | Qt.AlignVCenter)
+			if column == REMOVE_COLUMN:
+				return int(Qt.AlignCenter)
+			return int(Qt.AlignLeft | Qt.AlignVCenter)
+		if role == ITEM_ROLE:
+			return item
+		return None
+
+	def flags(self, index):
+		if not index.isValid():
+			return Qt.NoItemFlags
+		flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+		if index.column() < len(STOCK_COLUMNS) and STOCK_COLUMNS[index.column()] in ITEM_EDIT_COLUMNS:
+			flags |= Qt.ItemIsEditable
+		return flags
+
+	def parse_edit(self, column, text):
+		text = str(text).strip()
+		if column == "item_name":
+			if not text or len(text) > 32:
+				raise ValueError("ÜRÜN ADI 1-32 KARAKTER OLMALIDIR!")
+			return text
+		try:
+			value = float(text.replace(",", ".")) if column == "item_price" else int(text)
+		except ValueError:
+			raise ValueError("FİYAT VE STOK BİRER POZİTİF SAYI OLMALIDIR!")
+		if value < 0:
+			raise ValueError("FİYAT VE STOK BİRER POZİTİF SAYI OLMALIDIR!")
+		return value
+
+	def setData(self, index, value, role=Qt.EditRole):
+		if not index.isValid() or role != Qt.EditRole or not self.flags(index) & Qt.ItemIsEditable:
+			return False
+		column = STOCK_COLUMNS[index.column()]
+		try:
+			value = self.parse_edit(column, value)
+		except ValueError as e:
+			self.edit_failed.emit(str(e))
+			return False
+		item = self.items[index.row()]
+		if item[column] == value:
+			return True
+		item[column] = value
+		self.pending[(item["item_id"], column)] = value
+		self.flush_timer.start()
+		self.dataChanged.emit(index, index)
+		return True
+
+	def flush_edits(self):
+		self.flush_timer.stop()
+		if not self.pending:
+			return
+		edits = [(item_id, column, value) for (item_id, column), value in self.pending.items()]
+		self.pending = {}
+		self.db_worker.write("update_items", edits, callback=self._edits_saved)
+
+	def _edits_saved(self, rows):
+		if rows is None:
+			self.edit_failed.emit("DEĞİŞİKLİKLER KAYDEDİLEMEDİ!")
+			self.reload()
+			return
+		for row in rows:
+			position = self.positions.get(row["item_id"])
+			if position is None:
+				continue
+			self.items[position].update(row)
+			self.dataChanged.emit(self.index(position, 0), self.index(position, len(STOCK_COLUMNS) - 1))
+
+	def remove_item(self, item_id):
+		self.db_worker.write("remove_item", item_id, callback=self._item_removed)
+
+	def _item_removed(self, removed):
+		# The row leaves the table through the delete logged in the changes table
+		if removed:
+			self.changes.poll()
+
+class StockActionDelegate(QStyledItemDelegate):
+	def paint(self, painter, option, index):
+		if index.column() != REMOVE_COLUMN:
+			super().paint(painter, option, index)
+			return
+		cell = QStyleOptionViewItem(option)
+		self.initStyleOption(cell, index)
+		cell.text = ""
+		cell.widget.style().drawControl(QStyle.CE_ItemViewItem, cell, painter, cell.widget)
+		painter.save()
+		painter.setRenderHint(QPainter.Antialiasing)
+		hover = option.state & QStyle.State_MouseOver
+		painter.setBrush(QColor(theme.PALETTE["error" if hover else "primary"]))
+		painter.setPen(Qt.NoPen)
+		painter.drawRoundedRect(QRectF(option.rect).adjusted(6, 6, -6, -6), 12, 12)
+		painter.setPen(QColor(theme.PALETTE["text"]))
+		painter.setFont(option.font)
+		painter.drawText(option.rect, Qt.AlignCenter, index.data(Qt.DisplayRole))
+		painter.restore()
 
 class EditStockScreen(QWidget):
 	back_to_menu = Signal()
@@ -261,86 +370,48 @@ class EditStockScreen(QWidget):
 	def __init__(self, appdata, parent=None):
 		super().__init__(parent)
 		self.app_data = appdata
+		self.setObjectName("stockScreen")
+		self.search_timer = QTimer(self)
+		self.search_timer.setSingleShot(True)
+		self.search_timer.setInterval(SEARCH_DELAY)
+		self.search_timer.timeout.connect(self.refresh_stocks)
 
 		main_layout = QVBoxLayout()
 		main_layout.setAlignment(Qt.AlignCenter)
 
 		self.title_text = "STOKLAR"
-		self.title_style = """
-			font-size: 36px;
-			font-weight: bold;
-			color: #e9eaf2;
-		"""
-		self.title = QLabel(self.title_text)
-		self.title.setStyleSheet(self.title_style)
+		self.title = theme.set_role(QLabel(self.title_text), "title")
 		self.title.setAlignment(Qt.AlignCenter)
 		main_layout.addWidget(self.title)
 
-		self.inputstyle = """
-			QLineEdit {
-				font-size: 20px;
-				padding: 6px;
-				background-color: #011f26;
-				color: #e9eaf2;
-				border: 2px solid #e9eaf2;
-				border-radius: 12px;
-			}
-		"""
-
 		search_boxes_layout = QHBoxLayout()
 		search_boxes_layout.setAlignment(Qt.AlignTop)
 
 		self.id_input = QLineEdit()
 		self.id_input.setPlaceholderText("Ürün Kodu")
-		self.id_input.setStyleSheet(self.inputstyle)
+		theme.set_role(self.id_input, "input")
 		self.id_input.setMaxLength(32)
 
 		self.name_input = QLineEdit()
 		self.name_input.setPlaceholderText("Ürün Adı")
-		self.name_input.setStyleSheet(self.inputstyle)
+		theme.set_role(self.name_input, "input")
 		self.name_input.setMaxLength(32)
 
 		self.price_input = QLineEdit()
 		self.price_input.setPlaceholderText("Fiyat")
-		self.price_input.setStyleSheet(self.inputstyle)
+		theme.set_role(self.price_input, "input")
 		self.price_input.setMaxLength(32)
 	
 		self.stock_input = QLineEdit()
 		self.stock_input.setPlaceholderText("Stok")
-		self.stock_input.setStyleSheet(self.inputstyle)
+		theme.set_role(self.stock_input, "input")
 		self.stock_input.setMaxLength(32)
 
 		self.add_item_button = QPushButton("Ürün Ekle")
-		self.add_item_button.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 6px;
-				border-radius: 12px;
-				border: 2px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
+		theme.set_role(self.add_item_button, "action")
 
 		self.remove_filters_button = QPushButton("X")
-		self.remove_filters_button.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 6px;
-				border-radius: 12px;
-				border: 2px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
+		theme.set_role(self.remove_filters_button, "action")
 
 		search_boxes_layout.addWidget(self.id_input, 3)
 		search_boxes_layout.addWidget(self.name_input, 5)
@@ -369,34 +440,44 @@ class EditStockScreen(QWidget):
 			self.stock_input.clear()
 		})
 
-		self.scroll_area = QScrollArea()
-		self.scroll_area.setWidgetResizable(True)
-		self.scroll_area.setStyleSheet("border: none;")
-		main_layout.addWidget(self.scroll_area)
-
-		self.items_buttons_container = QVBoxLayout()
-		self.items_buttons_container.setAlignment(Qt.AlignTop)
-		container_widget = QWidget()
-		container_widget.setLayout(self.items_buttons_container)
-		self.scroll_area.setWidget(container_widget)
+		info_box = InfoBoxWidget("Düzenlemek için hücreye çift tıklayın. Varolan ürünün kodu doğrudan değiştirilemez.", icon_type="information")
+		info_box.setSizePolicy(QSizePolicy.Policy.MinimumExpanding, QSizePolicy.Policy.Fixed)
+		main_layout.addWidget(info_box)
+
+		self.stock_model = StockTableModel(self.app_data.db_worker, self.app_data.changes, parent=self)
+		self.stock_model.edit_failed.connect(self.error_message)
+		self.stock_view = QTableView()
+		self.stock_view.setObjectName("stockTable")
+		self.stock_view.setModel(self.stock_model)
+		self.stock_view.setItemDelegate(StockActionDelegate(self.stock_view))
+		self.stock_view.setSelectionBehavior(QTableView.SelectRows)
+		self.stock_view.setSelectionMode(QTableView.SingleSelection)
+		self.stock_view.setEditTriggers(QTableView.DoubleClicked | QTableView.EditKeyPressed)
+		self.stock_view.setMouseTracking(True)
+		self.stock_view.setShowGrid(False)
+		self.stock_view.setWordWrap(False)
+		self.stock_view.verticalHeader().setVisible(False)
+		self.stock_view.verticalHeader().setDefaultSectionSize(48)
+		header = self.stock_view.horizontalHeader()
+		header.setSectionResizeMode(QHeaderView.Fixed)
+		header.setSectionResizeMode(1, QHeaderView.Stretch)
+		for column, width in ((0, 220), (2, 160), (3, 140), (REMOVE_COLUMN, 120)):
+			self.stock_view.setColumnWidth(column, width)
+		header.setSortIndicator(0, Qt.AscendingOrder)
+		header.sortIndicatorChanged.connect(self.handle_sort_changed)
+		self.stock_view.setSortingEnabled(True)
+		self.stock_view.clicked.connect(self.handle_item_clicked)
+		main_layout.addWidget(self.stock_view, stretch=1)
+
+		self.no_items = theme.set_role(QLabel("Ürün Bulunamadı!"), "empty")
+		self.no_items.setAlignment(Qt.AlignCenter)
+		self.no_items.hide()
+		main_layout.addWidget(self.no_items, stretch=1)
+		self.stock_model.page_loaded.connect(self.update_empty_state)
 
 		back_button = QPushButton("Geri")
-		back_button.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 8px;
-				border-radius: 12px;
-				width: 300px;
-				height: 40px;
-				border: 2px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
+		theme.set_role(back_button, "back")
+		back_button.clicked.connect(self.stock_model.flush_edits)
 		back_button.clicked.connect(self.back_to_menu.emit)
 		back_button.clicked.connect(lambda:{
 			self.id_input.clear(),
@@ -408,23 +489,46 @@ class EditStockScreen(QWidget):
 		self.back_button = back_button
 
 		self.setLayout(main_layout)
-		self.refresh_stocks()
 
-	def handle_input_changed(self):
-		self.refresh_stocks()
-
-	def refresh_stocks(self):
-		self._clear_layout(self.items_buttons_container)
-		items = self.app_data.database_manager.get_filtered_items(
+	def filter_values(self):
+		return (
 			self.id_input.text().strip(),
 			self.name_input.text().strip(),
 			self.price_input.text().strip(),
 			self.stock_input.text().strip()
 		)
-		items.sort(key=lambda x: x["item_id"], reverse=False)
-		for row in items:
-			self.add_item_row(row, self.items_buttons_container)
-		self.items_buttons_container.addSpacerItem(QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding))
+
+	def handle_input_changed(self):
+		self.search_timer.start()
+
+	def refresh_stocks(self):
+		self.search_timer.stop()
+		self.stock_model.set_filters(*self.filter_values())
+
+	def handle_sort_changed(self, section, order):
+		# The remove column has nothing to sort by; put the indicator back on the active column
+		if section == REMOVE_COLUMN:
+			self.stock_view.horizontalHeader().setSortIndicator(
+				self.stock_model.sort_section,
+				Qt.DescendingOrder if self.stock_model.descending else Qt.AscendingOrder
+			)
+
+	def handle_item_clicked(self, index):
+		if index.column() != REMOVE_COLUMN:
+			return
+		item = index.data(ITEM_ROLE)
+		answer = QMessageBox.question(
+			self, "Ürünü Sil",
+			f"{item['item_id']} - {item['item_name']} silinsin mi?",
+			QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+		)
+		if answer == QMessageBox.Yes:
+			self.stock_model.remove_item(item["item_id"])
+
+	def update_empty_state(self):
+		empty = self.stock_model.rowCount() == 0
+		self.no_items.setVisible(empty)
+		self.stock_view.setVisible(not empty)
 
 	def	isfloat(self, string):
 		try:
@@ -444,112 +548,27 @@ class EditStockScreen(QWidget):
 			or not self.isfloat(self.stock_input.text().strip())):
 			self.error_message("ÜRÜN KODU, FİYATI VE STOĞU BİRER POZİTİF SAYI OLMALIDIR!")
 		else:
-			ret = self.app_data.database_manager.add_new_item(
-				self.id_input.text().strip(),
-				self.name_input.text().strip(),
-				self.price_input.text().strip(),
-				self.stock_input.text().strip()
+			values = self.filter_values()
+			self.app_data.db_worker.write(
+				"add_new_item", *values,
+				callback=lambda ok: self.item_added(ok, *values)
 			)
-			if ret == True:
-				print(f"NEW ITEM: {self.id_input.text().strip()} added. See details:")
-				print(f"    name: {self.name_input.text().strip()}")
-				print(f"   price: {self.price_input.text().strip()}")
-				print(f"   stock: {self.stock_input.text().strip()}")
-				#self.id_input.clear()
-				#self.name_input.clear()
-				#self.price_input.clear()
-				#self.stock_input.clear()
-				self.refresh_stocks()
-				self.id_input.setFocus()
-			else:
-				self.error_message("ÜRÜN KODLARI BENZERSİZ, SAYILAR POZİTİF OLMALIDIR!")
-	def add_item_row(self, row, layout):
-		row_widget = QWidget()
-		row_widget.setStyleSheet("""
-			QWidget {
-				background-color: #011f26;
-				border-radius: 12px;
-				padding: 6px;
-			}
-		""")	
-		row_layout = QHBoxLayout(row_widget)
-
-		item_id = QLabel(str(row["item_id"]))
-		item_id.setStyleSheet("""
-			color: #e9eaf2;
-			font-size: 20px;
-			font-weight: 600;
-		""")
-
-		item_name = QLabel(row["item_name"])
-		item_name.setStyleSheet("""
-			color: #e9eaf2;
-			font-size: 20px;
-			font-weight: 600;
-		""")
-
-		item_price = QLabel(str(f"{row["item_price"]:.2f}₺"))
-		item_price.setStyleSheet("""
-			color: #e9eaf2;
-			font-size: 20px;
-			font-weight: 600;
-		""")
-
-		item_stock = QLabel(str(row["item_stock"]) + " ad.")
-		item_stock.setStyleSheet("""
-			color: #e9eaf2;
-			font-size: 20px;
-			font-weight: 600;
-		""")
-
-		edit_btn = QPushButton("Düzenle")
-		edit_btn.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 16px;
-				font-weight: bold;
-				padding: 6px;
-				border-radius: 12px;
-				margin-left: 10px;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
-
-		edit_btn.clicked.connect(lambda: self.edit_item_details(row["item_id"]))
-
-		row_layout.addWidget(item_id, 3)
-		row_layout.addWidget(item_name, 5)
-		row_layout.addWidget(item_price, 2)
-		row_layout.addWidget(item_stock, 2)
 
-		row_layout.addStretch()
-		row_layout.addWidget(edit_btn, 3)
-		layout.addWidget(row_widget)
-
-	def	edit_item_details(self, id):
-		dlg = ItemEditDialog(id, self.app_data.database_manager, self)
-		dlg.exec()
+	def item_added(self, ok, item_id, name, price, stock):
+		if not ok:
+			self.error_message("ÜRÜN KODLARI BENZERSİZ, SAYILAR POZİTİF OLMALIDIR!")
+			return
+		print(f"NEW ITEM: {item_id} added. See details:")
+		print(f"    name: {name}")
+		print(f"   price: {price}")
+		print(f"   stock: {stock}")
 		self.refresh_stocks()
+		self.id_input.setFocus()
 
 	def	error_message(self, msg):
 		self.title.setText(msg)
-		self.title.setStyleSheet("""
-			font-size: 36px;
-			font-weight: bold;
-			color: #aa5555;
-		""")
+		theme.set_state(self.title, "error", True)
 		QTimer.singleShot(3000, lambda: {
 			self.title.setText(self.title_text),
-			self.title.setStyleSheet(self.title_style)
+			theme.set_state(self.title, "error", False)
 		})
-
-	def _clear_layout(self, layout):
-		while layout.count():
-			item = layout.takeAt(0)
-			if item.widget():
-				item.widget().deleteLater()
-			elif item.layout():
-				self._clear_layout(item.layout())
\ No newline at end of file
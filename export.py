@@ -0,0 +1,45 @@
+import os
+import sys
+import csv
+from data import DatabaseManager, SaleRow, ItemRow
+
+EXPORT_DIR = "exports"
+
+def _write_csv(path, header, rows):
+	count = 0
+	with open(path, "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow(header)
+		for row in rows:
+			writer.writerow(row)
+			count += 1
+	return count
+
+def export_sales(db, path=None, period=None, date_input="", name_input=""):
+	path = path or os.path.join(EXPORT_DIR, f"sales_{period or 'all'}.csv")
+	os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+	count = _write_csv(path, SaleRow._fields, db.iter_sales(period, date_input, name_input))
+	print(f"EXPORT  : {count} sales written to {path}")
+	return count
+
+def export_items(db, path=None, in_stock_only=False):
+	path = path or os.path.join(EXPORT_DIR, "items.csv")
+	os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+	rows = db.iter_available_products() if in_stock_only else db.iter_filtered_items()
+	count = _write_csv(path, ItemRow._fields, rows)
+	print(f"EXPORT  : {count} items written to {path}")
+	return count
+
+if __name__ == "__main__":
+	# python export.py sales [today|yesterday|shift|week|month]
+	# python export.py items [--in-stock]
+	if len(sys.argv) < 2 or sys.argv[1] not in ("sales", "items"):
+		print("Kullanım: python export.py sales [today|yesterday|shift|week|month]")
+		print("          python export.py items [--in-stock]")
+		sys.exit(1)
+	db = DatabaseManager()
+	if sys.argv[1] == "sales":
+		export_sales(db, period=sys.argv[2] if len(sys.argv) > 2 else None)
+	else:
+		export_items(db, in_stock_only="--in-stock" in sys.argv[2:])
+	db.close()
@@ -1,5 +1,175 @@
 import sqlite3
 
+# Turkish lowercase mapping in plain SQL: lower() only folds ASCII, and the
+# dotted/dotless I pairs must be mapped before it gets the chance.
+TURKISH_FOLD = (("I", "ı"), ("İ", "i"), ("Ç", "ç"), ("Ğ", "ğ"), ("Ö", "ö"), ("Ş", "ş"), ("Ü", "ü"))
+
+def turkish_fold_sql(expr):
+	for upper, lower in TURKISH_FOLD:
+		expr = f"replace({expr}, '{upper}', '{lower}')"
+	return f"lower({expr})"
+
+def change_log_triggers(table, key):
+	# One row per committed insert/update/delete, read back by data.ChangeDispatcher
+	return "".join(f"""
+	CREATE TRIGGER IF NOT EXISTS changes_{table}_{op} AFTER {op.upper()} ON {table} BEGIN
+		INSERT INTO changes (table_name, row_key, op) VALUES ('{table}', {ref}.{key}, '{op}');
+	END;""" for op, ref in (("insert", "new"), ("update", "new"), ("delete", "old")))
+
+MIGRATIONS = [
+	# 1: indexes for the cart, on-hold, sales history and campaign lookups
+	"""
+	CREATE INDEX IF NOT EXISTS idx_cart_items_sale
+		ON cart_items (sale_id, item_id, item_count, item_discount_num, item_total);
+	CREATE INDEX IF NOT EXISTS idx_sales_payment_date
+		ON sales (payment_method, sale_date, sale_id, customer_name, total_amount);
+	CREATE INDEX IF NOT EXISTS idx_sales_date
+		ON sales (sale_date, sale_id);
+	CREATE INDEX IF NOT EXISTS idx_campaigns_item
+		ON campaigns (item_id, min_quan, disc_type, disc_val);
+	""",
+	# 2: trigram index over folded item names, price/stock indexes for range filters
+	f"""
+	CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(item_name, tokenize = 'trigram');
+	INSERT INTO items_fts (rowid, item_name)
+		SELECT item_id, {turkish_fold_sql("item_name")} FROM items;
+	CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+		INSERT INTO items_fts (rowid, item_name) VALUES (new.item_id, {turkish_fold_sql("new.item_name")});
+	END;
+	CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+		DELETE FROM items_fts WHERE rowid = old.item_id;
+	END;
+	CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF item_id, item_name ON items BEGIN
+		DELETE FROM items_fts WHERE rowid = old.item_id;
+		INSERT INTO items_fts (rowid, item_name) VALUES (new.item_id, {turkish_fold_sql("new.item_name")});
+	END;
+	CREATE INDEX IF NOT EXISTS idx_items_price ON items (item_price, item_id);
+	CREATE INDEX IF NOT EXISTS idx_items_stock ON items (item_stock, item_id);
+	""",
+	# 3: name order for the stock table's keyset pages
+	"""
+	CREATE INDEX IF NOT EXISTS idx_items_name ON items (item_name, item_id);
+	""",
+	# 4: change log filled by triggers so screens can apply deltas instead of reloading
+	f"""
+	CREATE TABLE IF NOT EXISTS changes (
+		seq INTEGER PRIMARY KEY AUTOINCREMENT,
+		table_name TEXT NOT NULL,
+		row_key NOT NULL,
+		op TEXT NOT NULL CHECK(op IN ('insert', 'update', 'delete'))
+	);
+	{change_log_triggers("items", "item_id")}
+	{change_log_triggers("sales", "sale_id")}
+	""",
+	# 5: append-only stock ledger; items.item_stock becomes the balance it maintains
+	"""
+	CREATE TABLE IF NOT EXISTS stock_movements (
+		movement_id INTEGER PRIMARY KEY AUTOINCREMENT,
+		item_id INTEGER NOT NULL,
+		delta INTEGER NOT NULL,
+		reason TEXT NOT NULL CHECK(reason IN ('sale', 'return', 'receipt', 'adjustment')),
+		sale_id TEXT,
+		moved_at TEXT NOT NULL,
+		terminal_id INTEGER
+	);
+	CREATE INDEX IF NOT EXISTS idx_stock_movements_item ON stock_movements (item_id, movement_id);
+	CREATE INDEX IF NOT EXISTS idx_stock_movements_date ON stock_movements (moved_at, movement_id);
+	-- Balance of each item as of as_of, once every movement up to movement_id is applied
+	CREATE TABLE IF NOT EXISTS stock_snapshots (
+		item_id INTEGER NOT NULL,
+		movement_id INTEGER NOT NULL,
+		balance INTEGER NOT NULL,
+		as_of TEXT NOT NULL,
+		PRIMARY KEY (item_id, movement_id)
+	);
+	INSERT INTO stock_snapshots (item_id, movement_id, balance, as_of)
+		SELECT item_id, 0, item_stock, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime') FROM items;
+	-- CHECK(item_stock >= 0) on items turns an oversell into a failed insert
+	CREATE TRIGGER IF NOT EXISTS stock_movements_apply AFTER INSERT ON stock_movements BEGIN
+		SELECT RAISE(ABORT, 'stock movement for unknown item')
+			WHERE NOT EXISTS (SELECT 1 FROM items WHERE item_id = new.item_id);
+		UPDATE items SET item_stock = item_stock + new.delta WHERE item_id = new.item_id;
+	END;
+	""",
+	# 6: paid-sale rollups kept by DatabaseManager._rollup_sale, seeded from history
+	"""
+	CREATE TABLE IF NOT EXISTS sales_hourly (
+		hour TEXT NOT NULL,
+		payment_method TEXT NOT NULL,
+		sale_count INTEGER NOT NULL,
+		revenue REAL NOT NULL,
+		discount REAL NOT NULL,
+		PRIMARY KEY (hour, payment_method)
+	) WITHOUT ROWID;
+	CREATE TABLE IF NOT EXISTS sales_daily (
+		day TEXT NOT NULL,
+		payment_method TEXT NOT NULL,
+		sale_count INTEGER NOT NULL,
+		revenue REAL NOT NULL,
+		discount REAL NOT NULL,
+		PRIMARY KEY (day, payment_method)
+	) WITHOUT ROWID;
+	CREATE TABLE IF NOT EXISTS item_sales_daily (
+		day TEXT NOT NULL,
+		item_id INTEGER NOT NULL,
+		quantity INTEGER NOT NULL,
+		revenue REAL NOT NULL,
+		discount REAL NOT NULL,
+		PRIMARY KEY (day, item_id)
+	) WITHOUT ROWID;
+	INSERT INTO sales_hourly (hour, payment_method, sale_count, revenue, discount)
+		SELECT substr(sale_date, 1, 13), payment_method, COUNT(*), ROUND(SUM(total_amount), 2), ROUND(SUM(total_discount_num), 2)
+		FROM sales WHERE payment_method != 'WIP' GROUP BY 1, 2;
+	INSERT INTO sales_daily (day, payment_method, sale_count, revenue, discount)
+		SELECT substr(hour, 1, 10), payment_method, SUM(sale_count), ROUND(SUM(revenue), 2), ROUND(SUM(discount), 2)
+		FROM sales_hourly GROUP BY 1, 2;
+	INSERT INTO item_sales_daily (day, item_id, quantity, revenue, discount)
+		SELECT substr(s.sale_date, 1, 10), ci.item_id, SUM(ci.item_count), ROUND(SUM(ci.item_total), 2), ROUND(SUM(ci.item_discount_num), 2)
+		FROM cart_items AS ci
+		JOIN sales AS s ON s.sale_id = ci.sale_id
+		WHERE s.payment_method != 'WIP'
+		GROUP BY 1, 2;
+	""",
+	# 7: bumped on every campaign write so cached CampaignIndex copies reload only then
+	"""
+	CREATE TABLE IF NOT EXISTS campaign_version (
+		version INTEGER NOT NULL
+	);
+	INSERT INTO campaign_version (version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM campaign_version);
+	""" + "".join(f"""
+	CREATE TRIGGER IF NOT EXISTS campaign_version_{op} AFTER {op.upper()} ON campaigns BEGIN
+		UPDATE campaign_version SET version = version + 1;
+	END;""" for op in ("insert", "update", "delete")),
+	# 8: last cart journal entry each sale has absorbed, so crash recovery never replays it twice
+	"""
+	CREATE TABLE IF NOT EXISTS cart_journals (
+		sale_id TEXT PRIMARY KEY,
+		session TEXT NOT NULL,
+		applied_seq INTEGER NOT NULL
+	) WITHOUT ROWID;
+	""",
+]
+
+def migrate(db_name='database.db'):
+	conn = None
+	try:
+		conn = sqlite3.connect(db_name)
+		version = conn.execute("PRAGMA user_version").fetchone()[0]
+		for new_version, script in enumerate(MIGRATIONS[version:], version + 1):
+			try:
+				conn.executescript(f"BEGIN; {script} PRAGMA user_version = {new_version}; COMMIT;")
+			except sqlite3.Error:
+				conn.rollback()
+				raise
+			print(f"MIGRATE : {db_name} upgraded to schema version {new_version}.")
+		return True
+	except sqlite3.Error as e:
+		print(f"ERROR   : migrate: {e}")
+		return False
+	finally:
+		if conn:
+			conn.close()
+
 def create_tables(db_name='database.db'):
 	conn = None
 	try:
@@ -44,7 +214,7 @@ def create_tables(db_name='database.db'):
 		"""
 
 		create_campaigns_table = """
-		CREATE TABLE campaigns (
+		CREATE TABLE IF NOT EXISTS campaigns (
 			camp_id INTEGER PRIMARY KEY AUTOINCREMENT,
 			item_id INTEGER NOT NULL,
 			min_quan INTEGER NOT NULL,
@@ -60,6 +230,7 @@ def create_tables(db_name='database.db'):
 
 		conn.commit()
 		print(f"All three tables created successfully in {db_name}.")
+		migrate(db_name)
 
 	except sqlite3.Error as e:
 		print(f"An error occurred: {e}")
@@ -7,14 +7,31 @@ from PySide6.QtWidgets import (
 	QLabel, QHBoxLayout, QStackedWidget, QLineEdit, QMessageBox,
 	QInputDialog, QDialog
 )
-from PySide6.QtCore import Qt, Signal as pyqtSignal
+from PySide6.QtCore import Qt, QTimer, Signal as pyqtSignal
 
-from data import AppData, DatabaseManager
+from data import AppData, DatabaseManager, recover_cart_journals, STOCK_COMPACTION_INTERVAL, TERMINAL_ID, TERMINAL_IDS
+import post_sale
+from generate_tables import migrate
+import theme
 from new_sale import NewSaleScreen, CartScreen, CustomerCartScreen
 from view_sales import SalesScreen, WelcomeScreen
 from edit_stock import EditStockScreen
 from onhold_orders import OnHoldOrdersScreen
 
+class StartupReport:
+	def __init__(self):
+		self.started = self.last = time.perf_counter()
+		self.phases = []
+
+	def mark(self, phase):
+		now = time.perf_counter()
+		self.phases.append((phase, (now - self.last) * 1000))
+		self.last = now
+
+	def report(self):
+		phases = " | ".join(f"{phase} {ms:.0f} ms" for phase, ms in self.phases)
+		print(f"STARTUP : {phases} | total {(self.last - self.started) * 1000:.0f} ms")
+
 class PaymentDialog(QDialog):
 	cash_selected = pyqtSignal()
 	iban_selected = pyqtSignal()
@@ -23,51 +40,23 @@ class PaymentDialog(QDialog):
 		super().__init__(parent)
 		self.setWindowTitle("Ödeme Yöntemi Seçin")
 		self.setGeometry(0, 0, 400, 200)
-		self.setStyleSheet("background-color: #333; color: #e9eaf2;")
+		self.setObjectName("paymentDialog")
 
 		layout = QVBoxLayout()
 		self.setLayout(layout)
 
-		base_style = """
-			QPushButton {
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 8px;
-				border-radius: 12px;
-				width: 150px;
-				height: 40px;
-				border: 1px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				border: 5px solid #999;
-			}
-		"""
-
-		cash_button = QPushButton("Nakit")
-		cash_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #5b8c5a;
-			}
-		""")
+		cash_button = theme.set_role(QPushButton("Nakit"), "payment")
+		cash_button.setObjectName("cashButton")
 		cash_button.clicked.connect(self.accept_cash)
 		layout.addWidget(cash_button)
 
-		iban_button = QPushButton("IBAN")
-		iban_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #1b1a9a;
-			}
-		""")
+		iban_button = theme.set_role(QPushButton("IBAN"), "payment")
+		iban_button.setObjectName("ibanButton")
 		iban_button.clicked.connect(self.accept_iban)
 		layout.addWidget(iban_button)
 
-		cancel_button = QPushButton("İptal")
-		cancel_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #8c5b5a;
-			}
-		""")
+		cancel_button = theme.set_role(QPushButton("İptal"), "payment")
+		cancel_button.setObjectName("cancelPaymentButton")
 		cancel_button.clicked.connect(self.accept_cancel)
 		layout.addWidget(cancel_button)
 	
@@ -85,102 +74,162 @@ class PaymentDialog(QDialog):
 class Window1(QMainWindow):
 	def __init__(self, controller, second_window):
 		super().__init__()
-		self.setWindowTitle("BETA - Main Window")
+		self.setWindowTitle(f"BETA - Main Window (Kasa {controller.terminal_id})")
 		self.controller = controller
 		self.second_window = second_window
 
 		self.stacked_widget = QStackedWidget()
 		self.setCentralWidget(self.stacked_widget)
 
-		self.setStyleSheet("""
-			QMainWindow {
-				background-color: #111;
-			}
-			QWidget {
-				background-color: #111;
-			}
-		""")
-
 		self.main_menu_widget = self._create_main_menu()
 		self.stacked_widget.addWidget(self.main_menu_widget)
 		
 		self.new_sale_screen = NewSaleScreen()
 		self.stacked_widget.addWidget(self.new_sale_screen)
 		
-		self.sales_screen = SalesScreen(controller)
-		self.stacked_widget.addWidget(self.sales_screen)
-		
 		self.cart_screen = CartScreen()
 		self.stacked_widget.addWidget(self.cart_screen)
-
-		self.edit_stock_screen = EditStockScreen(controller)
-		self.stacked_widget.addWidget(self.edit_stock_screen)
-
-		self.onhold_screen = OnHoldOrdersScreen(controller)
-		self.stacked_widget.addWidget(self.onhold_screen)
+		controller.cart_state.snapshot_changed.connect(self.cart_screen.render_cart)
+
+		# Screens that load whole tables are built on first navigation
+		self.screens = {}
+		self.screen_factories = {
+			"sales": self._build_sales_screen,
+			"stock": self._build_edit_stock_screen,
+			"onhold": self._build_onhold_screen
+		}
 		
 		self.new_sale_button.clicked.connect(lambda: {
-			self.stacked_widget.setCurrentIndex(1),
+			self.stacked_widget.setCurrentWidget(self.new_sale_screen),
 			self.new_sale_screen.name_input.setFocus()
 		})
 		self.sales_button.clicked.connect(lambda: [
 			self.sales_screen.refresh_view_sales(),
-			self.stacked_widget.setCurrentIndex(2)
+			self.stacked_widget.setCurrentWidget(self.sales_screen)
 		])
 		self.stock_button.clicked.connect(lambda: {
-			self.stacked_widget.setCurrentIndex(4),
+			self.stacked_widget.setCurrentWidget(self.edit_stock_screen),
 			self.edit_stock_screen.refresh_stocks(),
 			self.edit_stock_screen.id_input.setFocus()
 		})
 		self.onhold_button.clicked.connect(lambda: [
 			self.onhold_screen.refresh_onhold_sales(),
-			self.stacked_widget.setCurrentIndex(5)
+			self.stacked_widget.setCurrentWidget(self.onhold_screen)
 		])
 		self.quit_button.clicked.connect(QApplication.instance().quit)
 
-		self.new_sale_screen.back_button.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(0))
+		self.new_sale_screen.back_button.clicked.connect(self.show_main_menu)
 		self.new_sale_screen.next_button.clicked.connect(self.start_sale_and_show_cart)
 
-		self.sales_screen.edit_sale_requested.connect(self.continue_sale)
-		self.sales_screen.back_button.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(0))
-
-		self.onhold_screen.back_button.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(0))
-		self.onhold_screen.continue_sale.connect(self.continue_sale)
-
-		self.edit_stock_screen.back_to_menu.connect(lambda: self.stacked_widget.setCurrentIndex(0))
-
 		self.cart_screen.back_button.clicked.connect(lambda: self.handle_put_on_onhold())
 		self.cart_screen.cancel_button.clicked.connect(self.handle_cancel)
 		self.cart_screen.item_added.connect(self.second_window.show_cart)
 		self.cart_screen.payment_button.clicked.connect(self.handle_payment)
+		self.controller.catalog_sync.catalog_changed.connect(self.cart_screen.sync_products)
 
 		self.showFullScreen()
 
+	def screen(self, name):
+		screen = self.screens.get(name)
+		if screen is None:
+			started = time.perf_counter()
+			screen = self.screens[name] = self.screen_factories[name]()
+			self.stacked_widget.addWidget(screen)
+			print(f"STARTUP : {name} screen built in {(time.perf_counter() - started) * 1000:.1f} ms")
+		return screen
+
+	@property
+	def sales_screen(self):
+		return self.screen("sales")
+
+	@property
+	def edit_stock_screen(self):
+		return self.screen("stock")
+
+	@property
+	def onhold_screen(self):
+		return self.screen("onhold")
+
+	def _build_sales_screen(self):
+		screen = SalesScreen(self.controller)
+		screen.edit_sale_requested.connect(self.continue_sale)
+		screen.back_button.clicked.connect(self.show_main_menu)
+		screen.back_button.clicked.connect(self.second_window.show_welcome)
+		return screen
+
+	def _build_edit_stock_screen(self):
+		screen = EditStockScreen(self.controller)
+		screen.back_to_menu.connect(self.show_main_menu)
+		screen.back_to_menu.connect(self.second_window.show_welcome)
+		return screen
+
+	def _build_onhold_screen(self):
+		screen = OnHoldOrdersScreen(self.controller)
+		screen.back_button.clicked.connect(self.show_main_menu)
+		screen.continue_sale.connect(self.continue_sale)
+		return screen
+
+	def show_main_menu(self):
+		self.stacked_widget.setCurrentWidget(self.main_menu_widget)
+
 	def	handle_put_on_onhold(self):
 		if self.controller.curr_sale_id:
-			self.controller.database_manager.update_sale_payment_info(self.controller.curr_sale_id, "WIP")
-			self.controller.database_manager.update_sale_date(self.controller.curr_sale_id)
-			self.stacked_widget.setCurrentIndex(0)
-			self.second_window.show_welcome()
+			self.commit_cart("WIP")
 
 	def handle_cash_payment(self):
 		if self.controller.curr_sale_id:
-			self.controller.database_manager.update_sale_payment_info(self.controller.curr_sale_id, "Nakit")
-			self.controller.database_manager.update_sale_date(self.controller.curr_sale_id)
-			self.stacked_widget.setCurrentIndex(0)
-			self.second_window.show_welcome()
+			self.commit_cart("Nakit")
 
 	def handle_iban_payment(self):
 		if self.controller.curr_sale_id:
 			sender_name, ok = QInputDialog.getText(self, "IBAN Bilgisi", "Gönderici Adı:")
 			if ok and sender_name:
-				self.controller.database_manager.update_sale_payment_info(self.controller.curr_sale_id, "IBAN", sender_name)
-				self.controller.database_manager.update_sale_date(self.controller.curr_sale_id)
-				self.stacked_widget.setCurrentIndex(0)
-				self.second_window.show_welcome()
+				self.commit_cart("IBAN", sender_name)
 			else:
 				return
 
+	def commit_cart(self, payment_method, payment_info=None):
+		session = self.controller.cart_session
+		if not session or session.committing:
+			return
+		reservations, journal = session.begin_commit()
+		self.cart_screen.set_committing(True)
+		self.controller.db_worker.write(
+			"finalize_sale", session.sale_id, payment_method, payment_info, reservations, journal,
+			callback=lambda ok: self.cart_committed(ok, session, reservations)
+		)
+
+	def cart_committed(self, ok, session, reservations):
+		session.end_commit(ok, reservations)
+		if not ok:
+			print(f"ERROR   : {session.sale_id} could not be saved, cart kept open.")
+			# Another till may have sold or removed these; re-read them before trimming the cart
+			self.controller.db_worker.read(
+				"refresh_catalog", [item_id for item_id, _ in reservations],
+				callback=lambda item_ids: self.cart_rejected(session)
+			)
+			return
+		self.cart_screen.set_committing(False)
+		if self.controller.cart_session is session:
+			self.controller.close_cart_session()
+		else:
+			session.close()
+		self.show_main_menu()
+		self.second_window.show_welcome()
+
+	def cart_rejected(self, session):
+		self.cart_screen.set_committing(False)
+		if self.controller.cart_session is not session:
+			return
+		trimmed = session.trim_to_stock(self.controller.catalog)
+		self.cart_screen.load_products(self.controller)
+		self.controller.cart_state.refresh()
+		if trimmed:
+			lines = "\n".join(f"{name}: {count} adet çıkarıldı" for name, count in trimmed)
+			QMessageBox.warning(self, "Stok Yetersiz", f"Bu ürünler başka bir kasada satıldı ya da silindi:\n{lines}\n\nSepet kalan stoğa göre güncellendi.")
+		else:
+			QMessageBox.warning(self, "Kayıt Hatası", "Sepet kaydedilemedi, lütfen tekrar deneyin.")
+
 	def handle_payment(self):
 		if not self.controller.curr_sale_id:
 			return
@@ -199,12 +248,17 @@ class Window1(QMainWindow):
 		payment_dialog.exec()
 
 	def handle_cancel(self):
-		self.controller.database_manager.remove_cart_of_sale(self.controller.curr_sale_id)
-		self.stacked_widget.setCurrentIndex(0)
+		session = self.controller.cart_session
+		if session and session.committing:
+			return
+		self.controller.close_cart_session()
+		self.controller.db_worker.write("remove_cart_of_sale", self.controller.curr_sale_id)
+		self.show_main_menu()
 		self.second_window.show_welcome()
 
 	def _create_main_menu(self):
 		main_menu_widget = QWidget()
+		main_menu_widget.setObjectName("mainMenu")
 		main_menu_layout = QVBoxLayout()
 		main_menu_layout.setAlignment(Qt.AlignCenter)
 
@@ -214,51 +268,15 @@ class Window1(QMainWindow):
 		self.onhold_button = QPushButton("Askıdakiler")
 		self.quit_button = QPushButton("Çıkış")
 
-		base_style = """
-			QPushButton {
-				color: #e9eaf2;
-				font-size: 36px;
-				font-weight: bold;
-				padding: 8px;
-				border-radius: 12px;
-				width: 500px;
-				height: 90px;
-			}
-			QPushButton:hover {
-				border: 5px solid #999;
-			}
-		"""
-
-		self.new_sale_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #27ae60; 
-				border: 2px solid #229954;
-			}
-		""")
-		self.sales_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #f39c12; 
-				border: 2px solid #e67e22;
-			}
-		""")
-		self.stock_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #3498db; 
-				border: 2px solid #2980b9;
-			}
-		""")
-		self.onhold_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #C27D0E; 
-				border: 2px solid #c0392b;
-			}
-		""")
-		self.quit_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #e74c3c; 
-				border: 2px solid #c0392b;
-			}
-		""")
+		for button, name in (
+			(self.new_sale_button, "newSaleButton"),
+			(self.sales_button, "salesButton"),
+			(self.stock_button, "stockButton"),
+			(self.onhold_button, "onholdButton"),
+			(self.quit_button, "quitButton")
+		):
+			button.setObjectName(name)
+			theme.set_role(button, "menu")
 
 		self.new_sale_button.setShortcut("n")
 		self.sales_button.setShortcut("v")
@@ -282,33 +300,34 @@ class Window1(QMainWindow):
 		if not customer_name:
 			customer_name = "BİLİNMEYEN"
 
-		self.controller.curr_customer_name = customer_name
-		self.controller.curr_sale_id = self.controller.database_manager.start_new_sale(customer_name)
+		self.controller.db_worker.write(
+			"start_new_sale", customer_name,
+			callback=lambda sale_id: self.show_cart_for_sale(sale_id, customer_name)
+		)
+
+	def show_cart_for_sale(self, sale_id, customer_name, lines=()):
+		if not sale_id:
+			return
+		self.controller.open_cart_session(sale_id, customer_name, lines)
 		self.cart_screen.refresh_data(self.controller)
-		self.stacked_widget.setCurrentIndex(3)
+		self.stacked_widget.setCurrentWidget(self.cart_screen)
 		self.second_window.show_cart()
 
 	def continue_sale(self, selected_id):
-		try:
-			cursor = self.controller.database_manager.conn.cursor()
-			cursor.execute("""
-				SELECT customer_name FROM
-				sales
-				WHERE sale_id = ?
-			""", (selected_id, ))
-			cust_name = cursor.fetchone()
-			if cust_name:
-				self.controller.curr_customer_name = cust_name[0]
-			else:
-				print(f"ERROR   : continue_sale: Sale {selected_id} not found in sales table!")
-				return
-			self.controller.curr_customer_name = cust_name[0]
-			self.controller.curr_sale_id = selected_id
-			self.cart_screen.refresh_data(self.controller)
-			self.stacked_widget.setCurrentIndex(3)
-			self.second_window.show_cart()
-		except Exception as e:
-			print(f"ERROR   : continue_sale :{e}")
+		self.controller.db_worker.read(
+			"get_sale_customer", selected_id,
+			callback=lambda customer_name: self.load_sale_lines(selected_id, customer_name)
+		)
+
+	def load_sale_lines(self, sale_id, customer_name):
+		if customer_name is None:
+			print(f"ERROR   : continue_sale: Sale {sale_id} not found in sales table!")
+			return
+		self.controller.curr_customer_name = customer_name
+		self.controller.db_worker.read(
+			"get_cart_session_lines", sale_id,
+			callback=lambda lines: self.show_cart_for_sale(sale_id, customer_name, lines)
+		)
 
 class Window2(QMainWindow):
 	def __init__(self, controller):
@@ -318,7 +337,6 @@ class Window2(QMainWindow):
 		
 		self.stacked_widget = QStackedWidget()
 		self.setCentralWidget(self.stacked_widget)
-		self.setStyleSheet("background-color: #111;")
 		
 		self.welcome_screen = WelcomeScreen()
 		self.stacked_widget.addWidget(self.welcome_screen)
@@ -333,29 +351,49 @@ class Window2(QMainWindow):
 		self.stacked_widget.setCurrentIndex(0)
 
 	def show_cart(self):
-		# This method is now called whenever the main cart is updated
+		# Cart lines arrive through controller.cart_state; this only updates the header
 		self.customer_cart_screen.refresh_data(self.controller)
 		self.stacked_widget.setCurrentIndex(1)
 		
 if __name__ == "__main__":
+	startup = StartupReport()
 	if not os.path.isfile("database.db"):
 		print("ERROR   : Gerekli dosya bulunamadı: 'database.db'")
 		print("Boş bir database oluşturmak için 'python generate_tables.py' deneyebilir,")
 		print("ya da mevcut database'inizin ismini 'database.db' olarak güncelleyebilirsiniz.")
 		sys.exit(1)
+	if TERMINAL_ID not in TERMINAL_IDS:
+		print(f"ERROR   : POSTRINK_TERMINAL 1 ile 9 arasında bir sayı olmalı: '{os.environ.get('POSTRINK_TERMINAL')}'")
+		sys.exit(1)
+	if not migrate("database.db"):
+		sys.exit(1)
+	startup.mark("migrate")
 
 	app = QApplication(sys.argv)
-	data = AppData()
+	theme.apply_theme(app)
+	data = AppData(os.environ.get("POSTRINK_DB_PROFILE", "throughput"))
+	app.aboutToQuit.connect(data.changes.close)
+	app.aboutToQuit.connect(data.db_worker.shutdown)
+	post_sale.register_default_hooks()
+	startup.mark("app data")
+	recover_cart_journals(data.database_manager)
+	startup.mark("journals")
+	data.catalog.warm(data.database_manager)
+	startup.mark("catalog")
+	compaction_timer = QTimer()
+	compaction_timer.timeout.connect(lambda: data.db_worker.write("compact_stock_movements"))
+	compaction_timer.start(STOCK_COMPACTION_INTERVAL)
+	data.db_worker.write("compact_stock_movements")
 
 	second_window = Window2(data)
 	main_window = Window1(data, second_window)
+	startup.mark("windows")
 
 	main_window.new_sale_button.clicked.connect(second_window.show_welcome)
 
 	main_window.new_sale_screen.back_button.clicked.connect(second_window.show_welcome)
-	main_window.sales_screen.back_button.clicked.connect(second_window.show_welcome)
-	main_window.cart_screen.back_button.clicked.connect(second_window.show_welcome)
-	main_window.edit_stock_screen.back_to_menu.connect(second_window.show_welcome)
 
+	# Fires once the event loop has painted the first frame
+	QTimer.singleShot(0, lambda: (startup.mark("first frame"), startup.report()))
 	sys.exit(app.exec())
 
@@ -1,9 +1,237 @@
+import re
 from PySide6.QtWidgets import (
 	QWidget, QVBoxLayout, QPushButton, QLabel, QHBoxLayout,
-	QLineEdit, QMessageBox, QScrollArea, QGridLayout, QSizePolicy
+	QLineEdit, QMessageBox, QSizePolicy,
+	QListView, QStyledItemDelegate, QStyle
 )
-from PySide6.QtCore import Qt, Signal, QDateTime, QTimer
+from PySide6.QtCore import Qt, Signal, QDateTime, QTimer, QAbstractListModel, QModelIndex, QSize, QRectF
+from PySide6.QtGui import QPainter, QColor, QPen, QFont
 from data import AppData
+import theme
+
+ITEM_ID_ROLE = Qt.UserRole
+ITEM_STOCK_ROLE = Qt.UserRole + 1
+CART_LINE_ROLE = Qt.UserRole + 2
+
+class ProductListModel(QAbstractListModel):
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self.products = []
+		self.rows = {}
+
+	def set_products(self, products):
+		self.beginResetModel()
+		self.products = [
+			{"item_id": p.item_id, "item_name": p.item_name, "item_stock": p.item_stock}
+			for p in products
+		]
+		self.rows = {p["item_id"]: row for row, p in enumerate(self.products)}
+		self.endResetModel()
+
+	def update_stock(self, item_id, stock, item_name=None):
+		row = self.rows.get(item_id)
+		if row is None:
+			return
+		self.products[row]["item_stock"] = stock
+		if item_name is not None:
+			self.products[row]["item_name"] = item_name
+		index = self.index(row)
+		self.dataChanged.emit(index, index)
+
+	def rowCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else len(self.products)
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		product = self.products[index.row()]
+		if role == Qt.DisplayRole:
+			return product["item_name"]
+		if role == ITEM_ID_ROLE:
+			return product["item_id"]
+		if role == ITEM_STOCK_ROLE:
+			return product["item_stock"]
+		return None
+
+	def flags(self, index):
+		if index.isValid() and self.products[index.row()]["item_stock"] > 0:
+			return Qt.ItemIsEnabled
+		return Qt.NoItemFlags
+
+class ProductTileDelegate(QStyledItemDelegate):
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self.font = QFont()
+		self.font.setPixelSize(20)
+		self.font.setBold(True)
+
+	def paint(self, painter, option, index):
+		painter.save()
+		painter.setRenderHint(QPainter.Antialiasing)
+		rect = QRectF(option.rect).adjusted(3, 3, -3, -3)
+		if not index.flags() & Qt.ItemIsEnabled:
+			background = QColor("#2a2f33")
+			text_color = QColor("#777")
+		elif option.state & QStyle.State_MouseOver:
+			background = QColor("#03658c")
+			text_color = QColor("#e9eaf2")
+		else:
+			background = QColor("#024059")
+			text_color = QColor("#e9eaf2")
+		painter.setBrush(background)
+		painter.setPen(QPen(QColor("#555"), 2))
+		painter.drawRoundedRect(rect, 12, 12)
+		painter.setFont(self.font)
+		painter.setPen(text_color)
+		painter.drawText(rect.adjusted(6, 6, -6, -6), Qt.AlignCenter | Qt.TextWordWrap, index.data(Qt.DisplayRole))
+		painter.restore()
+
+	def sizeHint(self, option, index):
+		grid = self.parent().gridSize()
+		return grid if grid.isValid() else QSize(160, 90)
+
+class ProductGridView(QListView):
+	def __init__(self, columns=2, parent=None):
+		super().__init__(parent)
+		self.columns = columns
+		self.setViewMode(QListView.IconMode)
+		self.setFlow(QListView.LeftToRight)
+		self.setWrapping(True)
+		self.setResizeMode(QListView.Adjust)
+		self.setMovement(QListView.Static)
+		self.setUniformItemSizes(True)
+		self.setSpacing(0)
+		self.setSelectionMode(QListView.NoSelection)
+		self.setMouseTracking(True)
+		self.setVerticalScrollMode(QListView.ScrollPerPixel)
+
+	def resizeEvent(self, event):
+		super().resizeEvent(event)
+		width = self.viewport().width() - self.style().pixelMetric(QStyle.PM_ScrollBarExtent) - 1
+		self.setGridSize(QSize(max(width // self.columns, 1), 90))
+
+class CartLineModel(QAbstractListModel):
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self.sale_id = None
+		self.lines = []
+
+	def apply_snapshot(self, snapshot):
+		lines = snapshot["lines"]
+		if snapshot["sale_id"] != self.sale_id:
+			self.beginResetModel()
+			self.sale_id = snapshot["sale_id"]
+			self.lines = [dict(line) for line in lines]
+			self.endResetModel()
+			return
+		new_ids = [line["item_id"] for line in lines]
+		keep = set(new_ids)
+		for row in reversed(range(len(self.lines))):
+			if self.lines[row]["item_id"] not in keep:
+				self.beginRemoveRows(QModelIndex(), row, row)
+				del self.lines[row]
+				self.endRemoveRows()
+		old_ids = [line["item_id"] for line in self.lines]
+		known = set(old_ids)
+		if old_ids != [item_id for item_id in new_ids if item_id in known]:
+			self.beginResetModel()
+			self.lines = [dict(line) for line in lines]
+			self.endResetModel()
+			return
+		for row, line in enumerate(lines):
+			if row < len(self.lines) and self.lines[row]["item_id"] == line["item_id"]:
+				if self.lines[row] != line:
+					self.lines[row] = dict(line)
+					index = self.index(row)
+					self.dataChanged.emit(index, index)
+			else:
+				self.beginInsertRows(QModelIndex(), row, row)
+				self.lines.insert(row, dict(line))
+				self.endInsertRows()
+
+	def rowCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else len(self.lines)
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		if role == Qt.DisplayRole:
+			return self.lines[index.row()]["item_name"]
+		if role == CART_LINE_ROLE:
+			return self.lines[index.row()]
+		return None
+
+class CartLineDelegate(QStyledItemDelegate):
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self.font = QFont()
+		self.font.setPixelSize(20)
+		self.font.setBold(True)
+		self.strike_font = QFont(self.font)
+		self.strike_font.setStrikeOut(True)
+
+	def paint(self, painter, option, index):
+		line = index.data(CART_LINE_ROLE)
+		discounted = line["item_discount_num"] != 0
+		painter.save()
+		painter.setRenderHint(QPainter.Antialiasing)
+		rect = QRectF(option.rect).adjusted(1, 1, -1, -2)
+		painter.setBrush(QColor("#2c503e" if discounted else "#024059"))
+		painter.setPen(QPen(QColor("#e9eaf2"), 0.5))
+		painter.drawRoundedRect(rect, 12, 12)
+		painter.setPen(QColor("#e9eaf2"))
+		painter.setFont(self.font)
+		text_rect = rect.adjusted(10, 4, -10, -4)
+		painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, f"{line['item_count']}")
+		painter.drawText(text_rect.adjusted(56, 0, -170, 0), Qt.AlignLeft | Qt.AlignVCenter, line["item_name"])
+		total = f"{line['item_total']:.2f} TL"
+		if discounted:
+			half = text_rect.height() / 2
+			painter.setFont(self.strike_font)
+			painter.drawText(text_rect.adjusted(0, 0, 0, -half), Qt.AlignRight | Qt.AlignVCenter, f"{line['item_total'] + line['item_discount_num']:.2f} TL")
+			painter.setFont(self.font)
+			painter.drawText(text_rect.adjusted(0, half, 0, 0), Qt.AlignRight | Qt.AlignVCenter, total)
+		else:
+			painter.drawText(text_rect, Qt.AlignRight | Qt.AlignVCenter, total)
+		painter.restore()
+
+	def sizeHint(self, option, index):
+		line = index.data(CART_LINE_ROLE)
+		return QSize(200, 68 if line["item_discount_num"] != 0 else 44)
+
+class CartView(QWidget):
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		layout = QVBoxLayout(self)
+		layout.setContentsMargins(0, 0, 0, 0)
+
+		self.model = CartLineModel(self)
+		self.list_view = QListView()
+		self.list_view.setModel(self.model)
+		self.list_view.setItemDelegate(CartLineDelegate(self.list_view))
+		self.list_view.setSelectionMode(QListView.NoSelection)
+		self.list_view.setVerticalScrollMode(QListView.ScrollPerPixel)
+		theme.set_role(self.list_view, "panel")
+		self.model.rowsInserted.connect(lambda *_: self.list_view.scrollToBottom())
+		layout.addWidget(self.list_view, 1)
+
+		self.totals = {}
+		for key, title in (("subtotal", "ARA TOPLAM:"), ("discount", "TOPLAM İNDİRİM:"), ("total", "TOTAL:")):
+			row = QWidget()
+			theme.set_role(row, "totals")
+			row_layout = QHBoxLayout(row)
+			row_layout.setContentsMargins(4, 4, 4, 4)
+			row_layout.addWidget(QLabel(title), 1)
+			self.totals[key] = QLabel("0.00 TL")
+			row_layout.addWidget(self.totals[key])
+			layout.addWidget(row)
+
+	def apply_snapshot(self, snapshot):
+		self.model.apply_snapshot(snapshot)
+		for key, label in self.totals.items():
+			text = f"{snapshot[key]:.2f} TL"
+			if label.text() != text:
+				label.setText(text)
 
 class NewSaleScreen(QWidget):
 	continue_sale = Signal()
@@ -11,66 +239,27 @@ class NewSaleScreen(QWidget):
 
 	def __init__(self, parent=None):
 		super().__init__(parent)
+		self.setObjectName("newSaleScreen")
 		
 		layout = QVBoxLayout()
 		layout.setAlignment(Qt.AlignCenter)
 
-		title = QLabel("MÜŞTERİ ADI")
-		title.setStyleSheet("""
-			font-size: 36px;
-			font-weight: bold;
-			color: #e9eaf2;
-		""")
+		title = theme.set_role(QLabel("MÜŞTERİ ADI"), "title")
 		title.setAlignment(Qt.AlignCenter)
 
 		self.name_input = QLineEdit()
 		self.name_input.setPlaceholderText("")
-		self.name_input.setStyleSheet("""
-			QLineEdit {
-				font-size: 20px;
-				padding: 6px;
-				background-color: #011f26;
-				color: #e9eaf2;
-				border: 2px solid #e9eaf2;
-				border-radius: 12px;
-			}
-		""")
+		theme.set_role(self.name_input, "input")
 		self.name_input.setMaxLength(32)
 		self.name_input.setFixedSize(750, 60)
 
 		self.next_button = QPushButton("Devam")
-		self.next_button.setStyleSheet("""
-			QPushButton {
-				background-color: #55cc55;
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 8px;
-				margin-top: 5px;
-				border-radius: 12px;
-				height: 60px;
-				border: 2px solid #e9eaf2;
-			}
-		""")
+		self.next_button.setObjectName("nextButton")
 
 		self.name_input.returnPressed.connect(self.next_button.click)
 
 		self.back_button = QPushButton("Geri")
-		self.back_button.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 8px;
-				border-radius: 12px;
-				height: 60px;
-				border: 2px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
+		theme.set_role(self.back_button, "back")
 
 		layout.addWidget(title)
 		layout.addWidget(self.name_input)
@@ -97,26 +286,28 @@ class CartScreen(QWidget):
 
 	def __init__(self, parent=None):
 		super().__init__(parent)
+		self.app_data = None
 
 		main_layout = QVBoxLayout()
 
 		info_layout = QHBoxLayout()
 		info_layout.setAlignment(Qt.AlignTop)
 
-		label_style = """
-			font-size: 20px;
-			color: #e9eaf2;
-			padding: 8px;
-			font-weight: bold;
-		"""
-		self.customer_label = QLabel("Müşteri: -")
-		self.customer_label.setStyleSheet(label_style)
+		self.customer_label = theme.set_role(QLabel("Müşteri: -"), "header")
 		info_layout.addWidget(self.customer_label, 1, Qt.AlignLeft)
 
 		info_layout.addStretch(1)
 
-		self.date_time_label = QLabel("-")
-		self.date_time_label.setStyleSheet(label_style)
+		self.quantity_input = QLineEdit()
+		self.quantity_input.setPlaceholderText("Adet x")
+		theme.set_role(self.quantity_input, "input")
+		self.quantity_input.setMaxLength(6)
+		self.quantity_input.setFixedWidth(150)
+		info_layout.addWidget(self.quantity_input, 0, Qt.AlignCenter)
+
+		info_layout.addStretch(1)
+
+		self.date_time_label = theme.set_role(QLabel("-"), "header")
 		info_layout.addWidget(self.date_time_label, 1, Qt.AlignRight)
 
 		self.timer = QTimer(self)
@@ -126,77 +317,29 @@ class CartScreen(QWidget):
 		content_layout = QHBoxLayout()
 	
 		products_layout_container = QVBoxLayout()
-		self.products_container = QWidget()
-		self.products_grid_layout = QGridLayout(self.products_container)
-		self.products_scroll_area = QScrollArea()
-		self.products_scroll_area.setWidgetResizable(True)
-		self.products_scroll_area.setWidget(self.products_container)
-		self.products_scroll_area.setStyleSheet("""
-			QScrollArea {
-				border: 2px solid #111;
-				border-radius: 12px;
-				text-align: left;
-				background-color: #333;
-			}
-		""")
-		products_layout_container.addWidget(self.products_scroll_area)
+		self.products_model = ProductListModel(self)
+		self.products_view = ProductGridView()
+		self.products_view.setModel(self.products_model)
+		self.products_view.setItemDelegate(ProductTileDelegate(self.products_view))
+		theme.set_role(self.products_view, "panel")
+		self.products_view.clicked.connect(self.handle_tile_click)
+		products_layout_container.addWidget(self.products_view)
 
 		cart_layout_container = QVBoxLayout()
 		
-		self.cart_items_layout = QVBoxLayout()
-		self.cart_items_layout.setAlignment(Qt.AlignTop)
-		self.cart_scroll_area = QScrollArea()
-		self.cart_scroll_area.setWidgetResizable(True)
-		cart_items_widget = QWidget()
-		cart_items_widget.setLayout(self.cart_items_layout)
-		self.cart_scroll_area.setWidget(cart_items_widget)
-		self.cart_scroll_area.setStyleSheet("""
-			QScrollArea {
-				border: 2px solid #111;
-				border-radius: 12px;
-				background-color: #333;
-			}
-		""")
-		cart_layout_container.addWidget(self.cart_scroll_area)
+		self.cart_view = CartView()
+		cart_layout_container.addWidget(self.cart_view)
 
 		buttons_layout = QVBoxLayout()
 
-		base_style = """
-			QPushButton {
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 8px;
-				border: 2px solid #e9eaf2;
-				border-radius: 12px;
-				width: 150px;
-				height: 36px;
-			}
-			QPushButton:hover {
-				border: 2px solid #999;
-			}
-		"""
-
-		self.back_button = QPushButton("Askıya Al")
-		self.back_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #bfab49;
-			}
-		""")
-
-		self.cancel_button = QPushButton("İşlem İptali")
-		self.cancel_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #e3655b;
-			}
-		""")
-
-		self.payment_button = QPushButton("Ödeme")
-		self.payment_button.setStyleSheet(base_style + """
-			QPushButton {
-				background-color: #5b8c5a;
-			}
-		""")
+		self.back_button = theme.set_role(QPushButton("Askıya Al"), "cart-action")
+		self.back_button.setObjectName("holdButton")
+
+		self.cancel_button = theme.set_role(QPushButton("İşlem İptali"), "cart-action")
+		self.cancel_button.setObjectName("cancelSaleButton")
+
+		self.payment_button = theme.set_role(QPushButton("Ödeme"), "cart-action")
+		self.payment_button.setObjectName("paymentButton")
 
 		self.back_button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
 		buttons_layout.addWidget(self.back_button, alignment=Qt.AlignCenter)
@@ -221,174 +364,75 @@ class CartScreen(QWidget):
 		self.date_time_label.setText(f"{formatted_datetime}")
 
 	def refresh_data(self, app_data: AppData):
+		self.app_data = app_data
 		self.customer_label.setText(f"Müşteri: {app_data.curr_customer_name}")
+		self.quantity_input.clear()
 		self.update_date_time()
 		self.load_products(app_data)
-		self.refresh_cart_items(app_data)
-
-	def wrap_text(self, text, max_chars=15):
-		words = text.split(' ')
-		lines = []
-		current_line = ''
-		for word in words:
-			if len(current_line + ' ' + word) > max_chars:
-				lines.append(current_line)
-				current_line = word
-			else:
-				if current_line:
-					current_line += ' ' + word
-				else:
-					current_line = word
-		lines.append(current_line)
-		return '\n'.join(lines)
-		
+		app_data.cart_state.refresh()
+
 	def load_products(self, app_data: AppData):
-		for i in reversed(range(self.products_grid_layout.count())):
-			widget_to_remove = self.products_grid_layout.itemAt(i).widget()
-			if widget_to_remove is not None:
-				widget_to_remove.setParent(None)
-
-		products = app_data.database_manager.get_available_products()
-		row = 0
-		col = 0
-		for product in products:
-			product_dict = dict(product)
-			item_name = product_dict.get('item_name', 'Bilinmeyen Ürün')
-
-			wrapped_name = self.wrap_text(item_name, 15)
-			item_button = QPushButton(wrapped_name)
-			item_button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
-			item_button.setStyleSheet("""
-				QPushButton {
-					background-color: #024059;
-					color: #e9eaf2;
-					font-size: 20px;
-					font-weight: bold;
-					border: 2px solid #555;
-					border-radius: 12px;
-				}
-				QPushButton:hover {
-					background-color: #03658c;
-				}
-			""")
-			item_button.clicked.connect(lambda _, id=product['item_id'], ad=app_data: self.handle_product_click(id, ad))
-			self.products_grid_layout.addWidget(item_button, row, col)
-			col += 1
-			if col > 1:
-				col = 0
-				row += 1
+		self.render_products(app_data.catalog.available_products(), app_data)
+		session = app_data.cart_session
+		if session:
+			for item_id in session.lines:
+				self.products_model.update_stock(item_id, session.available(item_id))
+
+	def sync_products(self, item_ids):
+		# CatalogSync re-read these items after another till (or this one) changed them
+		app_data = self.app_data
+		if not app_data:
+			return
+		session = app_data.cart_session
+		if session and not session.committing:
+			session.refresh_stock(app_data.catalog, item_ids)
+		rows = self.products_model.rows
+		items = {} if item_ids is None else {item_id: app_data.catalog.get(item_id) for item_id in item_ids}
+		# Tiles that have to appear (new or restocked) or disappear (removed) need a reload
+		if item_ids is None or any(
+			item is None if item_id in rows else item is not None and item.item_stock > 0
+			for item_id, item in items.items()
+		):
+			self.load_products(app_data)
+			return
+		for item_id, item in items.items():
+			if item_id in rows:
+				available = session.available(item_id) if session else None
+				self.products_model.update_stock(item_id, item.item_stock if available is None else available, item.item_name)
+
+	def render_products(self, products, app_data: AppData):
+		self.products_model.set_products(products)
+
+	def handle_tile_click(self, index):
+		if self.app_data and index.flags() & Qt.ItemIsEnabled:
+			self.handle_product_click(index.data(ITEM_ID_ROLE), self.app_data)
+
+	def take_multiplier(self):
+		match = re.fullmatch(r"\s*(\d+)\s*[xX*]?\s*", self.quantity_input.text())
+		if not match or int(match.group(1)) < 1:
+			return 1
+		return int(match.group(1))
 
 	def handle_product_click(self, item_id, app_data:AppData):
-		if app_data.database_manager.add_item_to_cart(app_data.curr_sale_id, item_id, 1, 0, 0):
-			self.refresh_cart_items(app_data)
+		session = app_data.cart_session
+		if session and session.committing:
+			return
+		if session and session.reserve(app_data.catalog, item_id, self.take_multiplier()):
+			self.quantity_input.clear()
+			self.products_model.update_stock(item_id, session.available(item_id))
+			app_data.cart_state.refresh()
 			self.item_added.emit()
 		else:
 			print("ERROR   : Item is out of stocks.")
 
-	def refresh_cart_items(self, app_data: AppData):
-		while self.cart_items_layout.count():
-			child = self.cart_items_layout.takeAt(0)
-			if child.widget():
-				child.widget().deleteLater()
-		cart_items = app_data.database_manager.get_cart_items(app_data.curr_sale_id)
-		
-		row_container_style = """
-			QWidget {
-				background-color: #024059;
-				margin: 0px 0px 0px 0px;
-				color: #e9eaf2;
-				border: .3px solid #e9eaf2;
-				border-radius: 12px;
-				margin-bottom: 2px;
-			}
-		"""
-		row_label_style = """
-			font-size: 20px;
-			font-weight: bold;
-		"""
-		for i, item in enumerate(cart_items):
-			if (item['item_discount_num'] == 0):
-				self.price_label = f"{item['item_total']:.2f} TL"
-				special_color = ""
-			else:
-				self.price_label = f"{self.strikethrough(f"{item['item_total'] + item['item_discount_num']:.2f} TL")}\n {item['item_total']:.2f} TL"
-				special_color = "QWidget{background-color: #2c503e;}"
-			
-			item_price_lbl = QLabel(self.price_label)
-			item_row_widget = QWidget()
-			item_row_widget.setStyleSheet(row_container_style + special_color)
-			item_row_layout = QHBoxLayout(item_row_widget)
-			item_row_layout.setContentsMargins(4, 4, 4, 4)
-
-			item_number_lbl = QLabel(f"{item['item_count']}")
-			item_number_lbl.setStyleSheet(row_label_style + "min-width: 16 px;")
-			item_number_lbl.setAlignment(Qt.AlignLeft)
-
-			item_name_lbl = QLabel(f"{item['item_name']}")
-			item_name_lbl.setStyleSheet(row_label_style + "min-width: 64px;")
-			item_name_lbl.setAlignment(Qt.AlignLeft)
-
-			item_price_lbl.setStyleSheet(row_label_style + "min-width: 36px;")
-			item_price_lbl.setAlignment(Qt.AlignRight)
-
-			item_row_layout.addWidget(item_number_lbl)
-			item_row_layout.addSpacing(2)
-			item_row_layout.addWidget(item_name_lbl, 1)
-			item_row_layout.addWidget(item_price_lbl)
-
-			self.cart_items_layout.addWidget(item_row_widget)
-
-		total_discount = app_data.database_manager.total_discount_num(app_data.curr_sale_id)
-		total_amount = app_data.database_manager.total_amount_calculator(app_data.curr_sale_id)
+	def set_committing(self, busy):
+		# Hold, cancel and pay stay off while a finalize_sale for this cart is in flight
+		for button in (self.back_button, self.cancel_button, self.payment_button):
+			button.setEnabled(not busy)
 
-		subtotal_row = QWidget()
-		subtotal_row.setStyleSheet(row_container_style + "QWidget{background-color: #50503e;}")
-		subtotal_layout = QHBoxLayout(subtotal_row)
-		subtotal_layout.setContentsMargins(4, 4, 4, 4)
-
-		subtotal_label = QLabel("ARA TOPLAM:")
-		subtotal_label.setStyleSheet(row_label_style)
-		subtotal_layout.addWidget(subtotal_label, 1)
-
-		subtotal_price = QLabel(f"{total_amount + total_discount:.2f} TL")
-		subtotal_price.setStyleSheet(row_label_style)
-		subtotal_layout.addWidget(subtotal_price)
-
-		self.cart_items_layout.addWidget(subtotal_row)
-
-		disc_row = QWidget()
-		disc_row.setStyleSheet(row_container_style + "QWidget{background-color: #50503e;}")
-		disc_layout = QHBoxLayout(disc_row)
-		disc_layout.setContentsMargins(4, 4, 4, 4)
-
-		disc_label = QLabel("TOPLAM İNDİRİM:")
-		disc_label.setStyleSheet(row_label_style)
-		disc_layout.addWidget(disc_label, 1)
-
-		disc_price = QLabel(f"{total_discount:.2f} TL")
-		disc_price.setStyleSheet(row_label_style)
-		disc_layout.addWidget(disc_price)
-
-		self.cart_items_layout.addWidget(disc_row)
-
-		total_row = QWidget()
-		total_row.setStyleSheet(row_container_style + "QWidget{background-color: #50503e;}")
-		total_layout = QHBoxLayout(total_row)
-		total_layout.setContentsMargins(4, 4, 4, 4)
-
-		total_label = QLabel("TOTAL:")
-		total_label.setStyleSheet(row_label_style)
-		total_layout.addWidget(total_label, 1)
-
-		total_price = QLabel(f"{total_amount:.2f} TL")
-		total_price.setStyleSheet(row_label_style)
-		total_layout.addWidget(total_price)
-
-		self.cart_items_layout.addWidget(total_row)
+	def render_cart(self, snapshot):
+		self.cart_view.apply_snapshot(snapshot)
 	
-	def strikethrough(self, text):
-		return "".join(c + '\u0336' for c in text)
-
 class CustomerCartScreen(QWidget):
 	def __init__(self, app_data: AppData):
 		super().__init__()
@@ -400,17 +444,8 @@ class CustomerCartScreen(QWidget):
 		info_layout = QHBoxLayout()
 		info_layout.setAlignment(Qt.AlignTop)
 
-		self.customer_label = QLabel("Hoş geldiniz, ")
-		self.date_time_label = QLabel("-")
-
-		label_style = """
-			font-size: 20px;
-			color: #e9eaf2;
-			padding: 8px;
-			font-weight: bold;
-		"""
-		self.customer_label.setStyleSheet(label_style)
-		self.date_time_label.setStyleSheet(label_style)
+		self.customer_label = theme.set_role(QLabel("Hoş geldiniz, "), "header")
+		self.date_time_label = theme.set_role(QLabel("-"), "header")
 
 		info_layout.addWidget(self.customer_label, 1, Qt.AlignLeft)
 		info_layout.addStretch(1)
@@ -420,23 +455,10 @@ class CustomerCartScreen(QWidget):
 
 		cart_layout_container = QVBoxLayout()
 
-		self.cart_items_layout = QVBoxLayout()
-		self.cart_items_layout.setAlignment(Qt.AlignTop)
-		self.cart_scroll_area = QScrollArea()
-		self.cart_scroll_area.setWidgetResizable(True)
-		cart_items_widget = QWidget()
-		cart_items_widget.setLayout(self.cart_items_layout)
-		self.cart_scroll_area.setWidget(cart_items_widget)
-		self.cart_scroll_area.setStyleSheet("""
-			QScrollArea {
-				border: 2px solid #111;
-				border-radius: 12px;
-				background-color: #333;
-			}
-		""")
-		cart_layout_container.addWidget(self.cart_scroll_area)
-
-		layout.addWidget(self.cart_scroll_area)
+		self.cart_view = CartView()
+		cart_layout_container.addWidget(self.cart_view)
+
+		layout.addLayout(cart_layout_container)
 
 		self.setLayout(layout)
 
@@ -444,6 +466,7 @@ class CustomerCartScreen(QWidget):
 		self.timer.timeout.connect(self.update_date_time)
 		self.timer.start(1000)
 
+		app_data.cart_state.snapshot_changed.connect(self.render_cart)
 		self.refresh_data(app_data)
 
 	def update_date_time(self):
@@ -451,111 +474,9 @@ class CustomerCartScreen(QWidget):
 		formatted_datetime = current_datetime.toString("dd.mm.yyyy | hh:mm:ss")
 		self.date_time_label.setText(formatted_datetime)
 
-	def strikethrough(self, text):
-		return "".join(c + '\u0336' for c in text)
-
 	def refresh_data(self, app_data: AppData):
 		self.customer_label.setText(f"Hoş geldiniz, {app_data.curr_customer_name}")
 		self.update_date_time()
-		self.refresh_cart_items(app_data)
-
-	def refresh_cart_items(self, app_data: AppData):
-		while self.cart_items_layout.count():
-			child = self.cart_items_layout.takeAt(0)
-			if child.widget():
-				child.widget().deleteLater()
-		cart_items = app_data.database_manager.get_cart_items(app_data.curr_sale_id)
-		
-		row_container_style = """
-			QWidget {
-				background-color: #024059;
-				margin: 0px 0px 0px 0px;
-				color: #e9eaf2;
-				border: .3px solid #e9eaf2;
-				border-radius: 12px;
-				margin-bottom: 2px;
-			}
-		"""
-		row_label_style = """
-			font-size: 20px;
-			font-weight: bold;
-		"""
-		for i, item in enumerate(cart_items):
-			if (item['item_discount_num'] == 0):
-				self.price_label = f"{item['item_total']:.2f} TL"
-				special_color = ""
-			else:
-				self.price_label = f"{self.strikethrough(f"{item['item_total'] + item['item_discount_num']:.2f} TL")}\n {item['item_total']:.2f} TL"
-				special_color = "QWidget{background-color: #2c503e;}"
-			
-			item_price_lbl = QLabel(self.price_label)
-			item_row_widget = QWidget()
-			item_row_widget.setStyleSheet(row_container_style + special_color)
-			item_row_layout = QHBoxLayout(item_row_widget)
-			item_row_layout.setContentsMargins(4, 4, 4, 4)
-
-			item_number_lbl = QLabel(f"{item['item_count']}")
-			item_number_lbl.setStyleSheet(row_label_style + "min-width: 16 px;")
-			item_number_lbl.setAlignment(Qt.AlignLeft)
-
-			item_name_lbl = QLabel(f"{item['item_name']}")
-			item_name_lbl.setStyleSheet(row_label_style + "min-width: 64px;")
-			item_name_lbl.setAlignment(Qt.AlignLeft)
-
-			item_price_lbl.setStyleSheet(row_label_style + "min-width: 36px;")
-			item_price_lbl.setAlignment(Qt.AlignRight)
-
-			item_row_layout.addWidget(item_number_lbl)
-			item_row_layout.addSpacing(2)
-			item_row_layout.addWidget(item_name_lbl, 1)
-			item_row_layout.addWidget(item_price_lbl)
-
-			self.cart_items_layout.addWidget(item_row_widget)
-
-		total_discount = app_data.database_manager.total_discount_num(app_data.curr_sale_id)
-		total_amount = app_data.database_manager.total_amount_calculator(app_data.curr_sale_id)
-
-		subtotal_row = QWidget()
-		subtotal_row.setStyleSheet(row_container_style + "QWidget{background-color: #50503e;}")
-		subtotal_layout = QHBoxLayout(subtotal_row)
-		subtotal_layout.setContentsMargins(4, 4, 4, 4)
-
-		subtotal_label = QLabel("ARA TOPLAM:")
-		subtotal_label.setStyleSheet(row_label_style)
-		subtotal_layout.addWidget(subtotal_label, 1)
-
-		subtotal_price = QLabel(f"{total_amount + total_discount:.2f} TL")
-		subtotal_price.setStyleSheet(row_label_style)
-		subtotal_layout.addWidget(subtotal_price)
-
-		self.cart_items_layout.addWidget(subtotal_row)
-
-		disc_row = QWidget()
-		disc_row.setStyleSheet(row_container_style + "QWidget{background-color: #50503e;}")
-		disc_layout = QHBoxLayout(disc_row)
-		disc_layout.setContentsMargins(4, 4, 4, 4)
-
-		disc_label = QLabel("TOPLAM İNDİRİM:")
-		disc_label.setStyleSheet(row_label_style)
-		disc_layout.addWidget(disc_label, 1)
-
-		disc_price = QLabel(f"{total_discount:.2f} TL")
-		disc_price.setStyleSheet(row_label_style)
-		disc_layout.addWidget(disc_price)
-
-		self.cart_items_layout.addWidget(disc_row)
-
-		total_row = QWidget()
-		total_row.setStyleSheet(row_container_style + "QWidget{background-color: #50503e;}")
-		total_layout = QHBoxLayout(total_row)
-		total_layout.setContentsMargins(4, 4, 4, 4)
-
-		total_label = QLabel("TOTAL:")
-		total_label.setStyleSheet(row_label_style)
-		total_layout.addWidget(total_label, 1)
-
-		total_price = QLabel(f"{total_amount:.2f} TL")
-		total_price.setStyleSheet(row_label_style)
-		total_layout.addWidget(total_price)
 
-		self.cart_items_layout.addWidget(total_row)
\ No newline at end of file
+	def render_cart(self, snapshot):
+		self.cart_view.apply_snapshot(snapshot)
\ No newline at end of file
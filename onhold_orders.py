@@ -4,7 +4,8 @@ from PySide6.QtWidgets import (
 	QHBoxLayout
 )
 from PySide6.QtCore import Qt, Signal
-from data import AppData
+from data import AppData, sorted_position
+import theme
 
 class OnHoldOrdersScreen(QWidget):
 	back_to_menu = Signal()
@@ -13,22 +14,24 @@ class OnHoldOrdersScreen(QWidget):
 	def __init__(self, app_data, parent=None):
 		super().__init__(parent)
 		self.app_data = app_data
+		self.setObjectName("onholdScreen")
+		self.onhold_sales = []
+		self.row_widgets = {}
+		self.seen_seq = None
+		self.dirty = {}
+		app_data.changes.sales_changed.connect(self.apply_changes)
+		app_data.changes.log_truncated.connect(self.reload_onhold_sales)
 
 		main_layout = QVBoxLayout()
 		main_layout.setAlignment(Qt.AlignCenter)
 
-		title = QLabel("ASKIDA BEKLEYEN İŞLEMLER")
-		title.setStyleSheet("""
-			font-size: 36px;
-			font-weight: bold;
-			color: #e9eaf2;
-		""")
+		title = theme.set_role(QLabel("ASKIDA BEKLEYEN İŞLEMLER"), "title")
 		title.setAlignment(Qt.AlignCenter)
 		main_layout.addWidget(title)
 
 		self.scroll_area = QScrollArea()
 		self.scroll_area.setWidgetResizable(True)
-		self.scroll_area.setStyleSheet("border: none;")
+		theme.set_role(self.scroll_area, "plain")
 		main_layout.addWidget(self.scroll_area, 1)
 
 		self.sales_buttons_container = QVBoxLayout()
@@ -38,28 +41,12 @@ class OnHoldOrdersScreen(QWidget):
 		self.scroll_area.setWidget(container_widget)
 
 		back_button = QPushButton("Geri")
-		back_button.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 8px;
-				border-radius: 12px;
-				width: 450px;
-				height: 80px;
-				border: 2px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
+		theme.set_role(back_button, "back")
 		back_button.clicked.connect(self.back_to_menu.emit)
 		main_layout.addWidget(back_button, alignment=Qt.AlignCenter)
 		self.back_button = back_button
 
 		self.setLayout(main_layout)
-		self.refresh_onhold_sales()
 
 	def format_datetime(self, dt_string):
 		date_part, time_part = dt_string.split('T')
@@ -69,68 +56,80 @@ class OnHoldOrdersScreen(QWidget):
 		return f"{day}/{month}/{year} | {hours}:{minutes}:{seconds}"
 
 	def refresh_onhold_sales(self):
+		# After the first load only the sales logged since then are re-read
+		if self.seen_seq is None:
+			self.reload_onhold_sales()
+		else:
+			self.app_data.changes.poll()
+
+	def reload_onhold_sales(self):
+		self.seen_seq = self.app_data.changes.seq
+		self.dirty = {}
+		self.app_data.db_worker.read("get_onhold_sales", callback=self.load_onhold_sales, key="onhold_sales")
+
+	def load_onhold_sales(self, onhold_sales):
 		self._clear_layout(self.sales_buttons_container)
-		onhold_sales = self.app_data.database_manager.get_onhold_sales()
-		onhold_sales.sort(key=lambda x: x["sale_date"], reverse=True)
-		for row in onhold_sales:
+		self.row_widgets = {}
+		self.onhold_sales = sorted(onhold_sales or [], key=self.sort_key, reverse=True)
+		for row in self.onhold_sales:
 			self.add_sale_row(row, self.sales_buttons_container)
 		self.sales_buttons_container.addSpacerItem(QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding))
 
-	def add_sale_row(self, row, layout):
+	def sort_key(self, sale):
+		return sale["sale_date"], sale["sale_id"]
+
+	def apply_changes(self, changes):
+		if self.seen_seq is None:
+			return
+		for change in changes:
+			if change.seq > self.seen_seq:
+				self.dirty[change.row_key] = None
+		self.seen_seq = max(self.seen_seq, changes[-1].seq)
+		if not self.dirty:
+			return
+		# Each read covers every sale still dirty, so a newer one can supersede an older one
+		sale_ids = list(self.dirty)
+		self.app_data.db_worker.read(
+			"get_onhold_sales", sale_ids,
+			callback=lambda rows: self._patch(sale_ids, rows), key="onhold_patch"
+		)
+
+	def _patch(self, sale_ids, rows):
+		matched = {row["sale_id"]: row for row in rows or []}
+		for sale_id in sale_ids:
+			self.dirty.pop(sale_id, None)
+			widget = self.row_widgets.pop(sale_id, None)
+			if widget:
+				self.onhold_sales = [sale for sale in self.onhold_sales if sale["sale_id"] != sale_id]
+				self.sales_buttons_container.removeWidget(widget)
+				widget.deleteLater()
+			row = matched.get(sale_id)
+			if row:
+				position = sorted_position(self.onhold_sales, self.sort_key, self.sort_key(row), descending=True)
+				self.onhold_sales.insert(position, row)
+				self.add_sale_row(row, self.sales_buttons_container, position)
+
+	def add_sale_row(self, row, layout, position=-1):
 		sale_id = row["sale_id"]
 		sale_date = self.format_datetime(row["sale_date"])
 		customer_name = row["customer_name"]
 		total_amount = row["total_amount"]
 		
 		row_widget = QWidget()
-		row_widget.setStyleSheet("""
-			QWidget {
-				background-color: #011f26;
-				border-radius: 12px;
-				padding: 6px;
-			}
-		""")
+		theme.set_role(row_widget, "row")
 		row_layout = QHBoxLayout(row_widget)
 		
 		date_label = QLabel(sale_date)
-		date_label.setStyleSheet("""
-			color: #e9eaf2;
-			font-size: 20px;
-			font-weight: 600;
-		""")
 		date_label.setAlignment(Qt.AlignLeft)
 
 		customer_label = QLabel(customer_name)
-		customer_label.setStyleSheet("""
-			color: #e9eaf2;
-			font-size: 20px;
-			font-weight: 600;
-		""")
 		customer_label.setAlignment(Qt.AlignLeft)
 
 		total_label = QLabel(f"{total_amount:.2f} ₺")
-		total_label.setStyleSheet("""
-			color: #e9eaf2;
-			font-size: 20px;
-			font-weight: 600;
-		""")
 		total_label.setAlignment(Qt.AlignRight)
 
 		btn = QPushButton("Askıdan Çağır")
-		btn.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 16px;
-				font-weight: bold;
-				padding: 6px;
-				border-radius: 12px;
-				margin-left: 10px;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
+		theme.set_role(btn, "row-action")
 		btn.setFixedSize(250, 50)
 		btn.clicked.connect(lambda checked, s=sale_id: self.load_sale(s))
 
@@ -141,7 +140,8 @@ class OnHoldOrdersScreen(QWidget):
 		row_layout.addStretch()
 		row_layout.addWidget(btn)
 		
-		layout.addWidget(row_widget)
+		layout.insertWidget(position, row_widget)
+		self.row_widgets[sale_id] = row_widget
 		
 	def _clear_layout(self, layout):
 		while layout.count():
@@ -152,13 +152,6 @@ class OnHoldOrdersScreen(QWidget):
 				self._clear_layout(item.layout())
 
 	def load_sale(self, sale_id):
+		# The customer name is read with the cart lines by Window1.continue_sale
 		self.app_data.curr_sale_id = sale_id
-
-		cur = self.app_data.database_manager.conn.cursor()
-		cur.execute("SELECT customer_name FROM sales WHERE sale_id = ?", (sale_id,))
-		row = cur.fetchone()
-		if row:
-			self.app_data.curr_customer_name = row["customer_name"]
-
-		print(f"OLD SALE: {sale_id} for {self.app_data.curr_customer_name}")
 		self.continue_sale.emit(sale_id)
@@ -0,0 +1,36 @@
+import os
+from tabulate import tabulate
+from data import add_post_sale_hook
+
+RECEIPT_DIR = "receipts"
+
+def render_receipt(sale):
+	os.makedirs(RECEIPT_DIR, exist_ok=True)
+	rows = [
+		(line["item_count"], line["item_name"], f"{line['item_total']:.2f} TL")
+		for line in sale["lines"]
+	]
+	payment_detail = sale["payment_info"] or "-"
+	receipt = "\n".join([
+		"PosTrink",
+		f"Fiş No   : {sale['sale_id']}",
+		f"Tarih    : {sale['sale_date']}",
+		f"Müşteri  : {sale['customer_name']}",
+		"",
+		tabulate(rows, headers=["Adet", "Ürün Adı", "Tutar"]),
+		"",
+		f"ARA TOPLAM     : {sale['total_amount'] + sale['total_discount_num']:.2f} TL",
+		f"TOPLAM İNDİRİM : {sale['total_discount_num']:.2f} TL",
+		f"TOTAL          : {sale['total_amount']:.2f} TL",
+		f"ÖDEME          : {sale['payment_method']} ({payment_detail})",
+		""
+	])
+	with open(os.path.join(RECEIPT_DIR, f"{sale['sale_id']}.txt"), "w", encoding="utf-8") as f:
+		f.write(receipt)
+
+def log_sale(sale):
+	print(f"SALE    : {sale['sale_id']} | {sale['customer_name']} | {sale['total_amount']:.2f} TL | {sale['payment_method']}")
+
+def register_default_hooks():
+	add_post_sale_hook(render_receipt)
+	add_post_sale_hook(log_sale)
@@ -0,0 +1,304 @@
+from string import Template
+
+# Widgets opt into rules below through their objectName or a "role" dynamic
+# property; the sheet is parsed once for the whole application.
+PALETTE = {
+	"background": "#111",
+	"panel": "#333",
+	"text": "#e9eaf2",
+	"muted": "#999",
+	"primary": "#024059",
+	"primary_hover": "#03658c",
+	"field": "#011f26",
+	"totals": "#50503e",
+	"onhold": "#bfab49",
+	"error": "#aa5555",
+}
+
+_QSS = Template("""
+	QWidget {
+		background-color: $background;
+		color: $text;
+	}
+
+	QLabel[role="title"] {
+		font-size: 36px;
+		font-weight: bold;
+		color: $text;
+	}
+	QLabel[role="title"][error="true"] {
+		color: $error;
+	}
+	QLabel[role="welcome"] {
+		font-size: 36px;
+		font-weight: bold;
+		color: $muted;
+	}
+	QLabel[role="empty"] {
+		font-size: 20px;
+		color: #ccc;
+	}
+	QLabel[role="header"] {
+		font-size: 20px;
+		color: $text;
+		padding: 8px;
+		font-weight: bold;
+	}
+	QLabel[role="field"] {
+		font-size: 20px;
+		font-weight: bold;
+		color: $text;
+	}
+	QLabel[role="details"] {
+		font-size: 16px;
+		font-weight: medium;
+		color: $text;
+	}
+
+	QLineEdit[role="input"], QComboBox[role="input"] {
+		font-size: 20px;
+		padding: 6px;
+		background-color: $field;
+		color: $text;
+		border: 2px solid $text;
+		border-radius: 12px;
+	}
+	#salesScreen QLineEdit[role="input"], #salesScreen QComboBox[role="input"] {
+		font-size: 16px;
+	}
+
+	QPushButton[role="action"], QPushButton[role="back"] {
+		background-color: $primary;
+		color: $text;
+		font-size: 20px;
+		font-weight: bold;
+		padding: 6px;
+		border-radius: 12px;
+		border: 2px solid $text;
+	}
+	QPushButton[role="back"] {
+		padding: 8px;
+	}
+	QPushButton[role="action"]:hover, QPushButton[role="back"]:hover, QPushButton[role="row-action"]:hover {
+		background-color: $primary_hover;
+	}
+	#newSaleScreen QPushButton[role="back"] {
+		height: 60px;
+	}
+	#salesScreen QPushButton[role="back"], #onholdScreen QPushButton[role="back"] {
+		width: 450px;
+		height: 80px;
+	}
+	#stockScreen QPushButton[role="back"] {
+		width: 300px;
+		height: 40px;
+	}
+	#salesScreen QPushButton[role="action"] {
+		font-size: 16px;
+	}
+	QPushButton#nextButton {
+		background-color: #55cc55;
+		color: $text;
+		font-size: 20px;
+		font-weight: bold;
+		padding: 8px;
+		margin-top: 5px;
+		border-radius: 12px;
+		height: 60px;
+		border: 2px solid $text;
+	}
+
+	QPushButton[role="menu"] {
+		color: $text;
+		font-size: 36px;
+		font-weight: bold;
+		padding: 8px;
+		border-radius: 12px;
+		width: 500px;
+		height: 90px;
+	}
+	QPushButton#newSaleButton {
+		background-color: #27ae60;
+		border: 2px solid #229954;
+	}
+	QPushButton#salesButton {
+		background-color: #f39c12;
+		border: 2px solid #e67e22;
+	}
+	QPushButton#stockButton {
+		background-color: #3498db;
+		border: 2px solid #2980b9;
+	}
+	QPushButton#onholdButton {
+		background-color: #C27D0E;
+		border: 2px solid #c0392b;
+	}
+	QPushButton#quitButton {
+		background-color: #e74c3c;
+		border: 2px solid #c0392b;
+	}
+	#mainMenu QPushButton[role="menu"]:hover {
+		border: 5px solid $muted;
+	}
+
+	QDialog#paymentDialog {
+		background-color: $panel;
+	}
+	QPushButton[role="payment"] {
+		color: $text;
+		font-size: 20px;
+		font-weight: bold;
+		padding: 8px;
+		border-radius: 12px;
+		width: 150px;
+		height: 40px;
+		border: 1px solid $text;
+	}
+	QPushButton[role="payment"]:hover {
+		border: 5px solid $muted;
+	}
+	QPushButton#cashButton {
+		background-color: #5b8c5a;
+	}
+	QPushButton#ibanButton {
+		background-color: #1b1a9a;
+	}
+	QPushButton#cancelPaymentButton {
+		background-color: #8c5b5a;
+	}
+
+	QPushButton[role="cart-action"] {
+		color: $text;
+		font-size: 20px;
+		font-weight: bold;
+		padding: 8px;
+		border: 2px solid $text;
+		border-radius: 12px;
+		width: 150px;
+		height: 36px;
+	}
+	QPushButton[role="cart-action"]:hover {
+		border: 2px solid $muted;
+	}
+	QPushButton#holdButton {
+		background-color: $onhold;
+	}
+	QPushButton#cancelSaleButton {
+		background-color: #e3655b;
+	}
+	QPushButton#paymentButton {
+		background-color: #5b8c5a;
+	}
+
+	QListView[role="panel"] {
+		border: 2px solid $background;
+		border-radius: 12px;
+		background-color: $panel;
+	}
+	QWidget[role="totals"], QWidget[role="totals"] QLabel {
+		background-color: $totals;
+		color: $text;
+		border: .3px solid $text;
+		border-radius: 12px;
+		font-size: 20px;
+		font-weight: bold;
+	}
+
+	QScrollArea[role="plain"] {
+		border: none;
+	}
+	QWidget[role="row"], QWidget[role="row"] QLabel {
+		background-color: $field;
+		border-radius: 12px;
+		padding: 6px;
+	}
+	QWidget[role="row"] QLabel {
+		color: $text;
+		font-size: 20px;
+		font-weight: 600;
+	}
+	QPushButton[role="row-action"] {
+		background-color: $primary;
+		color: $text;
+		font-size: 16px;
+		font-weight: bold;
+		padding: 6px;
+		border-radius: 12px;
+		margin-left: 10px;
+	}
+
+	QTableView#salesTable, QTableView#stockTable {
+		background-color: $background;
+		border: none;
+		font-size: 20px;
+		font-weight: 600;
+	}
+	QTableView#salesTable::item, QTableView#stockTable::item {
+		background-color: $field;
+		padding: 4px;
+		border-top: 2px solid $background;
+		border-bottom: 2px solid $background;
+	}
+	QTableView#stockTable::item:selected {
+		background-color: $primary;
+	}
+	#stockTable QHeaderView::section {
+		background-color: $panel;
+		color: $text;
+		font-size: 18px;
+		font-weight: bold;
+		padding: 6px;
+		border: none;
+	}
+	#stockTable QLineEdit {
+		background-color: $background;
+		color: $text;
+		font-size: 20px;
+	}
+
+	QTableWidget#saleDetailsTable {
+		background-color: $field;
+		color: $text;
+		font-size: 16px;
+		border: 1px solid $text;
+		border-radius: 12px;
+	}
+	#saleDetailsTable QHeaderView {
+		background-color: #05333d;
+		color: $text;
+		font-weight: bold;
+		font-size: 16px;
+		padding: 2px;
+		margin: 2px;
+		border: 1px solid $text;
+		border-radius: 12px;
+	}
+
+	#InfoBox QLabel {
+		color: #000000;
+		font-size: 20px;
+		font-weight: 700;
+		background-color: transparent;
+	}
+	#InfoBox[kind="warning"] QLabel {
+		color: #664D03;
+	}
+	#InfoBox[kind="information"] QLabel {
+		color: #004085;
+	}
+""").substitute(PALETTE)
+
+def apply_theme(app):
+	app.setStyleSheet(_QSS)
+
+def set_role(widget, role):
+	widget.setProperty("role", role)
+	return widget
+
+def set_state(widget, name, value):
+	# Dynamic properties are only re-read on polish, so flipping one after the
+	# widget is shown needs an explicit repolish.
+	widget.setProperty(name, value)
+	widget.style().unpolish(widget)
+	widget.style().polish(widget)
+	widget.update()
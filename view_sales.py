@@ -1,37 +1,34 @@
 from PySide6.QtWidgets import (
 	QWidget, QVBoxLayout, QPushButton, QLabel,
-	QScrollArea, QDialog, QTableWidget, QTableWidgetItem, QHeaderView,
-	QHBoxLayout, QSpacerItem, QSizePolicy, QLineEdit
+	QDialog, QTableWidget, QTableWidgetItem, QHeaderView,
+	QHBoxLayout, QLineEdit, QComboBox, QTableView, QStyledItemDelegate, QStyleOptionViewItem, QStyle
+)
+from PySide6.QtCore import Qt, Signal, QAbstractTableModel, QModelIndex, QRectF
+from PySide6.QtGui import QPainter, QColor
+from data import AppData, sorted_position
+import theme
+
+SALES_PAGE_SIZE = 100
+SALE_ROLE = Qt.UserRole
+DETAILS_COLUMN = 3
+EDIT_COLUMN = 4
+PERIODS = (
+	("Tüm Zamanlar", None),
+	("Bugün", "today"),
+	("Dün", "yesterday"),
+	("Bu Vardiya", "shift"),
+	("Bu Hafta", "week"),
+	("Bu Ay", "month")
 )
-from PySide6.QtCore import Qt, Signal
-from data import AppData
 
 class SaleDetailsDialog(QDialog):
-	def __init__(self, sale_id, db, parent=None):
+	def __init__(self, sale_id, rows, parent=None):
+		# rows come from DatabaseManager.get_sale_details, read on the worker
 		super().__init__(parent)
 		self.setWindowTitle(f"Satış {sale_id} Detayları")
-		self.setStyleSheet("""
-			background-color: #111;
-			color: #e9eaf2;
-		""")
 		layout = QVBoxLayout()
 		self.setLayout(layout)
 
-		try:
-			cursor = db.conn.cursor()
-			cursor.execute("""
-				SELECT ci.item_count, i.item_name, ci.item_total, s.payment_method, s.payment_info, s.customer_name
-				FROM items AS i
-				JOIN cart_items AS ci ON i.item_id = ci.item_id
-				JOIN sales AS s ON ci.sale_id = s.sale_id
-				WHERE ci.sale_id = ?
-			""", (sale_id,))
-			rows = cursor.fetchall()
-			rows = [dict(r) for r in rows] if rows else []
-		except Exception as e:
-			print(f"ERROR   : SaleDetailsDialog: {e}")
-			rows = []
-
 		if not rows:
 			label = QLabel("Satışta ürün bulunamadı.")
 			label.setAlignment(Qt.AlignCenter)
@@ -40,25 +37,7 @@ class SaleDetailsDialog(QDialog):
 
 		table = QTableWidget(len(rows) + 1, 3)
 		table.setHorizontalHeaderLabels(["Adet", "Ürün Adı", "Tutar"])
-		table.setStyleSheet("""
-			QTableWidget {
-				background-color: #011f26;
-				color: #e9eaf2;
-				font-size: 16px;
-				border: 1px solid #e9eaf2;
-				border-radius: 12px;
-			}
-			QHeaderView {
-				background-color: #05333d;
-				color: #e9eaf2;
-				font-weight: bold;
-				font-size: 16px;
-				padding: 2px;
-				margin: 2px;
-				border: 1px solid #e9eaf2;
-				border-radius: 12px;
-			}
-		""")
+		table.setObjectName("saleDetailsTable")
 		table.verticalHeader().setVisible(False)
 
 		total_sum = 0
@@ -101,16 +80,185 @@ class SaleDetailsDialog(QDialog):
 			payment_detail = "-"
 		payment_infos = f"MÜŞTERİ ADI:\t\t{r["customer_name"]}\nÖDEME YÖNTEMİ:\t{r["payment_method"]}\nÖDEME DETAYI:\t\t{payment_detail}\n"
 		payment_infos_label = QLabel(payment_infos)
-		payment_infos_label.setStyleSheet("""
-			font-size: 16px;
-			font-weight: medium;
-			color: #e9eaf2;
-		""")
+		theme.set_role(payment_infos_label, "details")
 		layout.addWidget(payment_infos_label)
 
 		self.resize(800, 600)
 		self.setMinimumSize(800, 600)
 
+class SalesTableModel(QAbstractTableModel):
+	page_loaded = Signal()
+
+	def __init__(self, db_worker, changes, page_size=SALES_PAGE_SIZE, parent=None):
+		super().__init__(parent)
+		self.db_worker = db_worker
+		self.changes = changes
+		self.page_size = page_size
+		self.key = f"sales_page:{id(self)}"
+		self.filters = None
+		self.sales = []
+		self.exhausted = True
+		self.loading = False
+		self.seen_seq = 0
+		self.generation = 0
+		self.dirty = {}
+		changes.sales_changed.connect(self.apply_changes)
+		changes.log_truncated.connect(self.reload)
+
+	def set_filters(self, period, date_input, name_input):
+		# Unchanged filters only need the deltas logged since the last load
+		self.changes.poll()
+		if self.filters == (period, date_input, name_input):
+			return
+		self.filters = (period, date_input, name_input)
+		self.reload()
+
+	def reload(self):
+		if self.filters is None:
+			return
+		self.beginResetModel()
+		self.sales = []
+		self.exhausted = False
+		self.loading = False
+		self.seen_seq = self.changes.seq
+		self.generation += 1
+		self.dirty = {}
+		self.endResetModel()
+		self.fetchMore(QModelIndex())
+
+	def apply_changes(self, changes):
+		if self.filters is None:
+			return
+		for change in changes:
+			if change.seq > self.seen_seq:
+				self.dirty[change.row_key] = None
+		self.seen_seq = max(self.seen_seq, changes[-1].seq)
+		if not self.dirty:
+			return
+		# Each read covers every row still dirty, so a newer one can supersede an older one
+		sale_ids = list(self.dirty)
+		self.db_worker.read(
+			"get_sales_by_ids", *self.filters, sale_ids,
+			callback=lambda rows, generation=self.generation: self._patch(generation, sale_ids, rows),
+			key=f"sales_patch:{id(self)}"
+		)
+
+	def sort_key(self, sale):
+		return sale["sale_date"], sale["sale_id"]
+
+	def _patch(self, generation, sale_ids, rows):
+		if generation != self.generation:
+			return
+		matched = {row["sale_id"]: row for row in rows or []}
+		for sale_id in sale_ids:
+			self.dirty.pop(sale_id, None)
+			row = matched.get(sale_id)
+			position = next((i for i, sale in enumerate(self.sales) if sale["sale_id"] == sale_id), None)
+			if position is not None and row and self.sort_key(self.sales[position]) == self.sort_key(row):
+				self.sales[position] = row
+				self.dataChanged.emit(self.index(position, 0), self.index(position, EDIT_COLUMN))
+				continue
+			if position is not None:
+				self.beginRemoveRows(QModelIndex(), position, position)
+				del self.sales[position]
+				self.endRemoveRows()
+			if row:
+				position = sorted_position(self.sales, self.sort_key, self.sort_key(row), descending=True)
+				# Rows past the last loaded one arrive with a later page
+				if position < len(self.sales) or self.exhausted:
+					self.beginInsertRows(QModelIndex(), position, position)
+					self.sales.insert(position, row)
+					self.endInsertRows()
+		self.page_loaded.emit()
+
+	def canFetchMore(self, parent=QModelIndex()):
+		return not parent.isValid() and not self.exhausted and not self.loading
+
+	def fetchMore(self, parent=QModelIndex()):
+		if not self.canFetchMore(parent):
+			return
+		self.loading = True
+		last = self.sales[-1] if self.sales else None
+		after = (last["sale_date"], last["sale_id"]) if last else None
+		self.db_worker.read(
+			"get_sales_page", *self.filters, after, self.page_size,
+			callback=self._append_page, key=self.key
+		)
+
+	def _append_page(self, page):
+		self.loading = False
+		page = page or []
+		if len(page) < self.page_size:
+			self.exhausted = True
+		if page:
+			self.beginInsertRows(QModelIndex(), len(self.sales), len(self.sales) + len(page) - 1)
+			self.sales.extend(page)
+			self.endInsertRows()
+		self.page_loaded.emit()
+
+	def rowCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else len(self.sales)
+
+	def columnCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else 5
+
+	def format_datetime(self, dt_string):
+		date_part, time_part = dt_string.split('T')
+		year, month, day = date_part.split('-')
+		hours, minutes, seconds_with_microseconds = time_part.split(':')
+		seconds = seconds_with_microseconds.split('.')[0]
+		return f"{day}/{month}/{year} | {hours}:{minutes}:{seconds}"
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		sale = self.sales[index.row()]
+		column = index.column()
+		onhold = sale["payment_method"] == "WIP"
+		if role == Qt.DisplayRole:
+			if column == 0:
+				return self.format_datetime(sale["sale_date"])
+			if column == 1:
+				return sale["customer_name"]
+			if column == 2:
+				return f"{sale['total_amount']:.2f} ₺"
+			if column == DETAILS_COLUMN:
+				return "İŞLEM ASKIDA" if onhold else "Detay"
+			if column == EDIT_COLUMN:
+				return "" if onhold else "Düzenle"
+		if role == Qt.TextAlignmentRole:
+			if column == 2:
+				return int(Qt.AlignRight | Qt.AlignVCenter)
+			if column >= DETAILS_COLUMN:
+				return int(Qt.AlignCenter)
+			return int(Qt.AlignLeft | Qt.AlignVCenter)
+		if role == Qt.ForegroundRole and column == DETAILS_COLUMN and onhold:
+			return QColor(theme.PALETTE["onhold"])
+		if role == SALE_ROLE:
+			return sale
+		return None
+
+class SaleActionDelegate(QStyledItemDelegate):
+	def paint(self, painter, option, index):
+		sale = index.data(SALE_ROLE)
+		if index.column() < DETAILS_COLUMN or sale["payment_method"] == "WIP":
+			super().paint(painter, option, index)
+			return
+		cell = QStyleOptionViewItem(option)
+		self.initStyleOption(cell, index)
+		cell.text = ""
+		cell.widget.style().drawControl(QStyle.CE_ItemViewItem, cell, painter, cell.widget)
+		painter.save()
+		painter.setRenderHint(QPainter.Antialiasing)
+		hover = option.state & QStyle.State_MouseOver
+		painter.setBrush(QColor(theme.PALETTE["primary_hover" if hover else "primary"]))
+		painter.setPen(Qt.NoPen)
+		painter.drawRoundedRect(QRectF(option.rect).adjusted(6, 6, -6, -6), 12, 12)
+		painter.setPen(QColor(theme.PALETTE["text"]))
+		painter.setFont(option.font)
+		painter.drawText(option.rect, Qt.AlignCenter, index.data(Qt.DisplayRole))
+		painter.restore()
+
 class SalesScreen(QWidget):
 	back_to_menu = Signal()
 	edit_sale_requested = Signal(str)
@@ -118,255 +266,114 @@ class SalesScreen(QWidget):
 	def __init__(self, appdata, parent=None):
 		super().__init__(parent)
 		self.app_data = appdata
+		self.setObjectName("salesScreen")
 
 		main_layout = QVBoxLayout()
 
 		self.title_text = "SATIŞLAR"
-		self.title_style = """
-			font-size: 36px;
-			font-weight: bold;
-			color: #e9eaf2;
-		"""
-		self.title = QLabel(self.title_text)
-		self.title.setStyleSheet(self.title_style)
+		self.title = theme.set_role(QLabel(self.title_text), "title")
 		self.title.setAlignment(Qt.AlignCenter)
 		main_layout.addWidget(self.title)
 
-		self.inputstyle = """
-			QLineEdit {
-				font-size: 16px;
-				padding: 6px;
-				background-color: #011f26;
-				color: #e9eaf2;
-				border: 2px solid #e9eaf2;
-				border-radius: 12px;
-			}
-		"""
-
 		search_boxes_layout = QHBoxLayout()
 		search_boxes_layout.setAlignment(Qt.AlignTop)
 
+		self.period_select = QComboBox()
+		theme.set_role(self.period_select, "input")
+		for label, period in PERIODS:
+			self.period_select.addItem(label, period)
+
 		self.date_input = QLineEdit()
-		self.date_input.setPlaceholderText("YYYY-AA-GGTSS:DD:SS")
-		self.date_input.setStyleSheet(self.inputstyle)
+		self.date_input.setPlaceholderText("GG.AA.YYYY - GG.AA.YYYY")
+		theme.set_role(self.date_input, "input")
 		self.date_input.setMaxLength(32)
 
 		self.name_input = QLineEdit()
 		self.name_input.setPlaceholderText("Müşteri Adı")
-		self.name_input.setStyleSheet(self.inputstyle)
+		theme.set_role(self.name_input, "input")
 		self.name_input.setMaxLength(32)
 
 		self.remove_filters_button = QPushButton("X")
-		self.remove_filters_button.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 16px;
-				font-weight: bold;
-				padding: 6px;
-				border-radius: 12px;
-				border: 2px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
-
-		search_boxes_layout.addWidget(self.date_input, 2)
+		theme.set_role(self.remove_filters_button, "action")
+
+		search_boxes_layout.addWidget(self.period_select, 2)
+		search_boxes_layout.addWidget(self.date_input, 3)
 		search_boxes_layout.addWidget(self.name_input, 5)
 		search_boxes_layout.addWidget(self.remove_filters_button, 1)
 
 		main_layout.addLayout(search_boxes_layout)
 
+		self.period_select.currentIndexChanged.connect(self.refresh_view_sales)
 		self.date_input.textChanged.connect(self.refresh_view_sales)
 		self.name_input.textChanged.connect(self.refresh_view_sales)
 
-		self.sales_buttons_layout = QVBoxLayout()
-		self.sales_buttons_layout.setAlignment(Qt.AlignTop)
-
-		scroll_content = QWidget()
-		scroll_content.setLayout(self.sales_buttons_layout)
-
-		scroll = QScrollArea()
-		scroll.setWidgetResizable(True)
-		scroll.setWidget(scroll_content)
-		main_layout.addWidget(scroll, stretch=1)
+		self.sales_model = SalesTableModel(self.app_data.db_worker, self.app_data.changes, parent=self)
+		self.sales_view = QTableView()
+		self.sales_view.setObjectName("salesTable")
+		self.sales_view.setModel(self.sales_model)
+		self.sales_view.setItemDelegate(SaleActionDelegate(self.sales_view))
+		self.sales_view.setSelectionMode(QTableView.NoSelection)
+		self.sales_view.setEditTriggers(QTableView.NoEditTriggers)
+		self.sales_view.setFocusPolicy(Qt.NoFocus)
+		self.sales_view.setMouseTracking(True)
+		self.sales_view.setShowGrid(False)
+		self.sales_view.setWordWrap(False)
+		self.sales_view.horizontalHeader().setVisible(False)
+		self.sales_view.verticalHeader().setVisible(False)
+		self.sales_view.verticalHeader().setDefaultSectionSize(52)
+		header = self.sales_view.horizontalHeader()
+		header.setSectionResizeMode(QHeaderView.Fixed)
+		header.setSectionResizeMode(1, QHeaderView.Stretch)
+		for column, width in ((0, 300), (2, 160), (DETAILS_COLUMN, 190), (EDIT_COLUMN, 150)):
+			self.sales_view.setColumnWidth(column, width)
+		self.sales_view.clicked.connect(self.handle_sale_clicked)
+		main_layout.addWidget(self.sales_view, stretch=1)
+
+		self.no_sales = theme.set_role(QLabel("Satış Bulunamadı!"), "empty")
+		self.no_sales.setAlignment(Qt.AlignCenter)
+		self.no_sales.hide()
+		main_layout.addWidget(self.no_sales, stretch=1)
+		self.sales_model.page_loaded.connect(self.update_empty_state)
 
 		self.back_button = QPushButton("Geri")
-		self.back_button.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 20px;
-				font-weight: bold;
-				padding: 8px;
-				border-radius: 12px;
-				width: 450px;
-				height: 80px;
-				border: 2px solid #e9eaf2;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
+		theme.set_role(self.back_button, "back")
 		main_layout.addWidget(self.back_button, alignment=Qt.AlignCenter)
 
 		self.setLayout(main_layout)
-		self.refresh_view_sales()
 		self.back_button.clicked.connect(self.back_to_menu.emit)
 
-	def format_datetime(self, dt_string):
-		date_part, time_part = dt_string.split('T')
-		year, month, day = date_part.split('-')
-		hours, minutes, seconds_with_microseconds = time_part.split(':')
-		seconds = seconds_with_microseconds.split('.')[0]
-		return f"{day}/{month}/{year} | {hours}:{minutes}:{seconds}"
-	
-	def load_sales(self):
-		while self.sales_buttons_layout.count():
-			child = self.sales_buttons_layout.takeAt(0)
-			if child.widget():
-				child.widget().deleteLater()
-		sales = self.app_data.database_manager.get_filtered_sales(
-			self.date_input.text().strip(),
-			self.name_input.text().strip()
-		)
-		if not sales:
-			no_sales = QLabel("Satış Bulunamadı!")
-			no_sales.setStyleSheet("""
-				font-size: 20px;
-				color: #ccc;
-			""")
-			no_sales.setAlignment(Qt.AlignCenter)
-			self.sales_buttons_layout.addWidget(no_sales)
+	def update_empty_state(self):
+		empty = self.sales_model.rowCount() == 0
+		self.no_sales.setVisible(empty)
+		self.sales_view.setVisible(not empty)
+
+	def handle_sale_clicked(self, index):
+		sale = index.data(SALE_ROLE)
+		if sale["payment_method"] == "WIP":
 			return
-		for sale in sales:
-			self.add_sale_row(sale, self.sales_buttons_layout)
-
-	def add_sale_row(self, sale, layout):
-		sale_id = sale.get("sale_id")
-		sale_date = self.format_datetime(sale.get("sale_date"))
-		customer_name = sale.get("customer_name", "Müşteri")
-		total_amount = sale.get("total_amount", 0)
-		payment_method = sale.get("payment_method")
-
-		row_widget = QWidget()
-		row_widget.setStyleSheet("""
-			QWidget {
-				background-color: #011f26;
-				border-radius: 12px;
-				padding: 4px;
-				margin: 2px;
-			}
-		""")
-		row_layout = QHBoxLayout(row_widget)
-
-		date_label = QLabel(sale_date)
-		date_label.setStyleSheet("""
-			color: #e9eaf2;
-			font-size: 20px;
-			font-weight: 600;
-		""")
-		date_label.setAlignment(Qt.AlignLeft)
-
-		customer_label = QLabel(customer_name)
-		customer_label.setStyleSheet("""
-			color: #e9eaf2;
-			font-size: 20px;
-			font-weight: 600;
-			margin-right: 20px;
-		""")
-		customer_label.setAlignment(Qt.AlignLeft)
-
-		total_label = QLabel(f"{total_amount:.2f} ₺")
-		total_label.setStyleSheet("""
-			color: #e9eaf2;
-			font-size: 20px;
-			font-weight: 600;
-		""")
-		total_label.setAlignment(Qt.AlignRight)
-
-		onhold_label = QLabel("İŞLEM ASKIDA")
-		onhold_label.setStyleSheet("""
-			color: #bfab49;
-			font-size: 20px;
-			font-weight: 800;
-		""")
-
-		view_btn = QPushButton("Detay")
-		view_btn.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 16px;
-				font-weight: 800;
-				padding: 6px;
-				border-radius: 12px;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
-		view_btn.clicked.connect(lambda checked, sid=sale_id: self.show_sale_details(sid))
-
-		edit_btn = QPushButton("Düzenle")
-		edit_btn.setStyleSheet("""
-			QPushButton {
-				background-color: #024059;
-				color: #e9eaf2;
-				font-size: 16px;
-				font-weight: 800;
-				padding: 6px;
-				border-radius: 12px;
-			}
-			QPushButton:hover {
-				background-color: #03658c;
-			}
-		""")
-		edit_btn.clicked.connect(lambda checked, sid=sale_id: self.edit_sale_requested.emit(sid))
-
-		row_layout.addWidget(date_label, 3)
-		row_layout.addWidget(customer_label, 5)
-
-		row_layout.addStretch()
-
-		row_layout.addWidget(total_label, 3)
-
-		if (payment_method == 'WIP'):
-			row_layout.addWidget(onhold_label, 2)
-		else:
-			row_layout.addWidget(view_btn, 1)
-			row_layout.addWidget(edit_btn, 1)
-
-		layout.addWidget(row_widget)
+		if index.column() == DETAILS_COLUMN:
+			self.show_sale_details(sale["sale_id"])
+		elif index.column() == EDIT_COLUMN:
+			self.edit_sale_requested.emit(sale["sale_id"])
 
 	def show_sale_details(self, sale_id):
-		dlg = SaleDetailsDialog(sale_id, self.app_data.database_manager, self)
-		dlg.exec()
+		self.app_data.db_worker.read(
+			"get_sale_details", sale_id,
+			callback=lambda rows: SaleDetailsDialog(sale_id, rows, self).exec()
+		)
 
 	def refresh_view_sales(self):
-		self._clear_layout(self.sales_buttons_layout)
-		self.load_sales()
-		self.sales_buttons_layout.addSpacerItem(QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding))
-
-	def _clear_layout(self, layout):
-		while layout.count():
-			item = layout.takeAt(0)
-			if item.widget():
-				item.widget().deleteLater()
-			elif item.layout():
-				self._clear_layout(item.layout())
+		self.sales_model.set_filters(
+			self.period_select.currentData(),
+			self.date_input.text().strip(),
+			self.name_input.text().strip()
+		)
 
 class WelcomeScreen(QWidget):
 	def __init__(self):
 		super().__init__()
 		layout = QVBoxLayout()
-		label = QLabel("Hoş geldiniz!")
+		label = theme.set_role(QLabel("Hoş geldiniz!"), "welcome")
 		label.setAlignment(Qt.AlignCenter)
-		label.setStyleSheet("""
-			font-size: 36px;
-			font-weight: bold;
-			color: #999;
-		""")
 		layout.addWidget(label)
 		self.setLayout(layout)